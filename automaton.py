@@ -25,10 +25,24 @@ This module is not optimized and is designed for educational purposes.
 import subprocess
 import tempfile
 import copy
+import hashlib
 import os
+import sys
+import mmap
+import struct
 import platform
 import threading
+import contextvars
+import time
 import xml.etree.ElementTree as ET
+import xml.parsers.expat
+from collections import OrderedDict, deque
+from collections.abc import Set
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class pretty_set(frozenset):
@@ -95,14 +109,20 @@ def _extract_maximal_id( obj ):
     >>> _extract_maximal_id( A() )
     >>> _extract_maximal_id(( pretty_set([1,(9,1),5]) ))
     9
+    >>> _extract_maximal_id( [ 'abc', (2,'d') ] )
+    2
 
     """
     if type(obj) == int:
         return obj
+    if type(obj) == str:
+        return None
     try:
         maximum = None
         for i in obj:
             val = _extract_maximal_id(i)
+            if val == None :
+                continue
             if maximum == None :
                 maximum = val
             elif val > maximum:
@@ -129,14 +149,20 @@ def _extract_minimal_id( obj ):
     >>> _extract_minimal_id( A() )
     >>> _extract_minimal_id(( pretty_set([1,(9,1),5]) ))
     1
+    >>> _extract_minimal_id( [ 'abc', (2,'d') ] )
+    2
 
     """
     if type(obj) == int:
         return obj
+    if type(obj) == str:
+        return None
     try:
         minimum = None
         for i in obj:
             val = _extract_minimal_id(i)
+            if val == None :
+                continue
             if minimum == None :
                 minimum = val
             elif val < minimum:
@@ -172,6 +198,326 @@ class _object_to_id:
             return None
         return self._map[ obj ]
 
+class _version_token:
+    """
+    The version of the content of an automaton (see automaton._get_version).
+    Data computed from that content can be memoized in ``key``.
+    """
+    __slots__ = ( 'key', )
+
+    def __init__( self ):
+        self.key = None
+
+
+class automaton_set_view( Set ):
+    """
+    This class implements a read-only view on a set of an automaton 
+    (states, initial states, final states, alphabet or epsilons).
+
+    The view does not copy the set: it reads the current content of the 
+    automaton at each access. The operators of sets (|, &, -, ^) return 
+    pretty_set objects.
+
+    Example:
+
+    >>> a = automaton( states=[1,2] )
+    >>> v = a.states_view()
+    >>> 2 in v and len( v ) == 2
+    True
+    >>> a.add_state( 3 )
+    >>> v == set( [1,2,3] )
+    True
+    >>> v - set( [1] )
+    {2, 3}
+    """
+    __slots__ = ( '_automaton', '_name' )
+
+    def __init__( self, aut, name ):
+        self._automaton = aut
+        self._name = name
+
+    @classmethod
+    def _from_iterable( cls, iterable ):
+        return pretty_set( iterable )
+
+    def __contains__( self, obj ):
+        return obj in getattr( self._automaton, self._name )
+
+    def __iter__( self ):
+        return iter( getattr( self._automaton, self._name ) )
+
+    def __len__( self ):
+        return len( getattr( self._automaton, self._name ) )
+
+    def __repr__( self ):
+        return repr( pretty_set( self ) )
+
+class automaton_transitions_view( Set ):
+    """
+    This class implements a read-only view on the transitions of an 
+    automaton.
+
+    The transitions (q1, c, q2) are generated on the fly from the 
+    adjacency of the automaton; no set of transitions is built.
+
+    Example:
+
+    >>> a = automaton( transitions=[ (0,'a',1), (0,'a',2), (1,'b',0) ] )
+    >>> v = a.transitions_view()
+    >>> (0,'a',2) in v and not (2,'a',0) in v
+    True
+    >>> len( v )
+    3
+    >>> v == a.get_transitions()
+    True
+    """
+    __slots__ = ( '_automaton', )
+
+    def __init__( self, aut ):
+        self._automaton = aut
+
+    @classmethod
+    def _from_iterable( cls, iterable ):
+        return pretty_set( iterable )
+
+    def __contains__( self, transition ):
+        if not isinstance( transition, tuple ) or len( transition ) != 3:
+            return False
+        ( q1, lettre, q2 ) = transition
+        try:
+            return q2 in self._automaton._adjacence.get( (q1, lettre), () )
+        except TypeError:
+            return False
+
+    def __iter__( self ):
+        adjacence = self._automaton._adjacence
+        for key in adjacence:
+            for end in adjacence[ key ]:
+                yield ( key[0], key[1], end )
+
+    def __len__( self ):
+        adjacence = self._automaton._adjacence
+        result = 0
+        for key in adjacence:
+            result += len( adjacence[ key ] )
+        return result
+
+    def __repr__( self ):
+        return repr( pretty_set( self ) )
+
+class instrumentation_stats:
+    """
+    This class contains the counters and the phase timers filled while an
+    instrumentation block is active (see instrumentation).
+
+    Counters:
+    subsets -- the number of sets of states created by the subset 
+               constructions (determinisations and lazy_dfa)
+    delta_calls -- the number of calls to the transition function of a set
+                   of states
+    closure_iterations -- the number of steps of the computations of the 
+                          epsilon closures, plus the number of states whose
+                          closure has been looked up
+    transitions_added -- the number of transitions added to automata
+    clones -- the number of cloned automata
+
+    The attribute ``phases`` maps the name of each timed phase to its total 
+    duration in seconds.
+    """
+    def __init__( self ):
+        self.subsets = 0
+        self.delta_calls = 0
+        self.closure_iterations = 0
+        self.transitions_added = 0
+        self.clones = 0
+        self.phases = {}
+
+    def add_phase( self, name, seconds ):
+        self.phases[ name ] = self.phases.get( name, 0 ) + seconds
+
+    def merge( self, stats ):
+        """
+        Adds the counters and the phase durations of ``stats``.
+        """
+        self.subsets += stats.subsets
+        self.delta_calls += stats.delta_calls
+        self.closure_iterations += stats.closure_iterations
+        self.transitions_added += stats.transitions_added
+        self.clones += stats.clones
+        for name in stats.phases:
+            self.add_phase( name, stats.phases[ name ] )
+
+    def as_dict( self ):
+        """
+        Returns the counters and the phases in a dictionary.
+        """
+        return {
+            'subsets' : self.subsets,
+            'delta_calls' : self.delta_calls,
+            'closure_iterations' : self.closure_iterations,
+            'transitions_added' : self.transitions_added,
+            'clones' : self.clones,
+            'phases' : dict( self.phases )
+        }
+
+class _phase_timer:
+    __slots__ = ( '_stats', '_name', '_start' )
+
+    def __init__( self, stats, name ):
+        self._stats = stats
+        self._name = name
+
+    def __enter__( self ):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self._stats.add_phase( self._name, time.perf_counter() - self._start )
+        return False
+
+class _no_timer:
+    __slots__ = ()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        return False
+
+_NO_TIMER = _no_timer()
+
+class instrumentation:
+    """
+    This class implements an opt-in instrumentation of the algorithms.
+
+    While a ``with instrumentation():`` block runs, the algorithms count 
+    their work in an instrumentation_stats object, returned by the with 
+    statement. When no block is active in any thread, the cost of the 
+    instrumentation is a test of a class attribute in the hot paths.
+
+    The active stats and the hooks are kept in context variables: a block
+    only counts the work of its own thread (or asyncio task), and the 
+    blocks of two threads do not interfere.
+
+    Blocks can be nested: the counters of an inner block are added to the
+    counters of the outer block when it ends. At the end of a block, the 
+    stats are given to the ``hook`` of the block, if any, and to the 
+    functions registered in the current context with 
+    instrumentation.add_hook() (for example, the exporter of a monitoring 
+    system).
+
+    Example:
+
+    >>> a = automaton(
+    ...     epsilons=['0'], initials=[0], finals=[2],
+    ...     transitions=[ (0,'a',1), (1,'0',2) ]
+    ... )
+    >>> reports = []
+    >>> with instrumentation( hook=reports.append ) as stats:
+    ...     a.word_is_recognized( ['a'] )
+    ...     b = a.clone()
+    ...     b.add_transition( (2,'b',0) )
+    True
+    >>> stats.delta_calls, stats.clones, stats.transitions_added
+    (1, 1, 1)
+    >>> reports[0] is stats
+    True
+    >>> instrumentation.get_active() == None
+    True
+    >>> seen = []
+    >>> with instrumentation() as stats:
+    ...     t = threading.Thread(
+    ...         target=lambda: seen.append( instrumentation.get_active() )
+    ...     )
+    ...     t.start()
+    ...     t.join()
+    >>> seen
+    [None]
+    """
+    # Number of blocks active in all the threads: the hot paths look up the
+    # stats of their context only when it is not 0.
+    running = 0
+    _running_lock = threading.Lock()
+    _active = contextvars.ContextVar( 'instrumentation_active', default=None )
+    _hooks = contextvars.ContextVar( 'instrumentation_hooks', default=() )
+
+    def __init__( self, hook=None ):
+        self._hook = hook
+        self._previous = None
+        self._token = None
+        self.stats = None
+
+    def __enter__( self ):
+        self._previous = instrumentation._active.get()
+        self.stats = instrumentation_stats()
+        self._token = instrumentation._active.set( self.stats )
+        with instrumentation._running_lock:
+            instrumentation.running += 1
+        return self.stats
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        instrumentation._active.reset( self._token )
+        with instrumentation._running_lock:
+            instrumentation.running -= 1
+        if self._previous != None:
+            self._previous.merge( self.stats )
+        if self._hook != None:
+            self._hook( self.stats )
+        for hook in instrumentation._hooks.get():
+            hook( self.stats )
+        return False
+
+    @staticmethod
+    def get_active():
+        """
+        Returns the stats of the innermost block active in the current 
+        context, or None.
+        """
+        return instrumentation._active.get()
+
+    @staticmethod
+    def count( name, value=1 ):
+        """
+        Adds ``value`` to the counter ``name`` of the active stats, if any.
+        """
+        stats = instrumentation._active.get()
+        if stats != None:
+            setattr( stats, name, getattr( stats, name ) + value )
+
+    @staticmethod
+    def add_hook( hook ):
+        """
+        Registers, in the current context, a function called with the stats
+        at the end of every instrumentation block.
+        """
+        instrumentation._hooks.set( instrumentation._hooks.get() + ( hook, ) )
+
+    @staticmethod
+    def remove_hook( hook ):
+        """
+        Unregisters a function registered by add_hook().
+        """
+        hooks = list( instrumentation._hooks.get() )
+        hooks.remove( hook )
+        instrumentation._hooks.set( tuple( hooks ) )
+
+    @staticmethod
+    def phase( name ):
+        """
+        Returns a context manager adding its duration to the phase ``name``
+        of the active stats (it does nothing if no block is active).
+        """
+        stats = instrumentation._active.get()
+        if stats == None:
+            return _NO_TIMER
+        return _phase_timer( stats, name )
+
+def _sort_key( obj ):
+    # A total order on the characters, even when their types differ.
+    if type( obj ) in ( int, str ):
+        return ( type( obj ).__name__, obj )
+    return ( type( obj ).__name__, repr( obj ) )
+
 def _test_is_hashable( obj, name ):
         try:
             pretty_set( [obj] )
@@ -195,6 +541,20 @@ class automaton:
     F is a subset of Q and is the set of final states;
     T is a subset of Q X A X Q, and is the set of transitions.
     """
+    # Containers that clone() shares between automata. A container whose
+    # name is in _shared is copied before its first mutation; the sets of
+    # _adjacence are copied one by one, _owned_buckets being the keys of
+    # the buckets already copied (None when no bucket is shared).
+    _shared_attributes = (
+        '_states', '_initial_states', '_final_states',
+        '_alphabet', '_epsilons', '_adjacence'
+    )
+    _shared = frozenset()
+    _owned_buckets = None
+    # Token identifying the content of the automaton (see _get_version),
+    # None when it has not been requested since the last modification.
+    _version = None
+
     def __init__(
         self, alphabet=None, epsilons=None, states=None, initials=None, finals=None, 
         transitions=None
@@ -249,12 +609,16 @@ class automaton:
         >>> b.get_states() == set( [(1,2), (4,5), (1,3)] )
         True
         """
+        self._shared = frozenset()
+        self._owned_buckets = None
         self._epsilons = set()
         self._states = set( )
         self._adjacence = {}
         self._initial_states = set( )
         self._final_states = set( )
         self._alphabet = set( )
+        self._closures = None
+        self._maximal_id = None
         if alphabet != None:
             self.add_characters( alphabet )
         if epsilons != None :
@@ -285,8 +649,38 @@ class automaton:
         ... )
         >>> b.get_maximal_id()
         11
+
+        The maximal integer is kept up to date when states are added, so 
+        this function runs in constant time.
         """
-        return _extract_maximal_id(self._states)
+        return self._maximal_id
+
+    def get_new_id( self ):
+        """
+        Returns an integer greater than all the integers present among the
+        states (0 if there is no integer), in constant time. 
+
+        Example:
+
+        >>> a = automaton( states=[ (1,4), 'a' ] )
+        >>> a.get_new_id()
+        5
+        >>> a.add_state( a.get_new_id() )
+        >>> a.get_new_id()
+        6
+        >>> automaton( states=[ 'a' ] ).get_new_id()
+        0
+        """
+        if self._maximal_id == None:
+            return 0
+        return self._maximal_id + 1
+
+    def _update_maximal_id( self, state ):
+        maximum = _extract_maximal_id( state )
+        if maximum != None and (
+            self._maximal_id == None or maximum > self._maximal_id
+        ):
+            self._maximal_id = maximum
 
     def get_minimal_id( self ):
         """
@@ -364,6 +758,12 @@ class automaton:
         self._initial_states = _translate(
             self._initial_states, nb
         )
+        self._release(
+            '_states', '_initial_states', '_final_states', '_adjacence'
+        )
+        self._closures = None
+        if self._maximal_id != None:
+            self._maximal_id += nb
 
     def map( self, f ):
         """
@@ -403,6 +803,11 @@ class automaton:
         self._initial_states = set(
             map( _f, self._initial_states )
         )
+        self._release(
+            '_states', '_initial_states', '_final_states', '_adjacence'
+        )
+        self._closures = None
+        self._maximal_id = _extract_maximal_id( self._states )
     def __eq__( self, a ):
         """
         Tests whether two automata are equals.
@@ -439,19 +844,165 @@ class automaton:
         ... )
         >>> a == d
         False
+
+        The sizes of the sets are compared first, and the transitions are
+        compared (state, character) by (state, character), so no set is 
+        built.
+        """
+        if (
+            len( self._states ) != len( a._states ) or
+            len( self._initial_states ) != len( a._initial_states ) or
+            len( self._final_states ) != len( a._final_states ) or
+            len( self._alphabet ) != len( a._alphabet ) or
+            len( self._epsilons ) != len( a._epsilons )
+        ):
+            return False
+        if not (
+            self._alphabet == a._alphabet and
+            self._epsilons == a._epsilons and
+            self._states == a._states and
+            self._initial_states == a._initial_states and
+            self._final_states == a._final_states
+        ):
+            return False
+        nb_transitions = 0
+        for key in self._adjacence:
+            ends = self._adjacence[ key ]
+            if len( ends ) > 0:
+                if ends != a._adjacence.get( key, () ):
+                    return False
+                nb_transitions += len( ends )
+        for key in a._adjacence:
+            nb_transitions -= len( a._adjacence[ key ] )
+        return nb_transitions == 0
+
+    def canonical_form( self ):
+        """
+        Returns the canonical form of a deterministic automaton.
+
+        The states accessible from the initial state are numbered from 1 
+        in the order of a breadth first search, the transitions of a state 
+        being visited in the order of the sorted alphabet. Two deterministic
+        automata have the same canonical form if and only if their 
+        accessible parts are isomorphic and they have the same alphabet and 
+        the same epsilon characters. The computation runs in linear time in
+        the number of states times the size of the alphabet.
+
+        The canonical form is the tuple
+        (alphabet, epsilons, number of states, finals, transitions)
+        where the alphabet and the epsilons are sorted tuples, finals is 
+        the sorted tuple of the numbers of the final states and transitions
+        is the tuple of the triples (q1, i, q2) where i is the index of the 
+        character in the alphabet.
+
+        Example:
+
+        >>> a = automaton(
+        ...     initials=['x'], finals=['y'],
+        ...     transitions=[ ('x','a','y'), ('y','b','x'), ('y','a','y') ]
+        ... )
+        >>> a.canonical_form()
+        (('a', 'b'), (), 2, (2,), ((1, 0, 2), (2, 0, 2), (2, 1, 1)))
+        >>> b = automaton(
+        ...     initials=[7], finals=[3], states=[8],
+        ...     transitions=[ (7,'a',3), (3,'a',3), (3,'b',7) ]
+        ... )
+        >>> a.canonical_form() == b.canonical_form()
+        True
+        >>> automaton( initials=[0,1] ).canonical_form()
+        Traceback (most recent call last):
+            ...
+        Exception: In automaton module, only deterministic automata have a canonical form.
         """
-        return (
-            self.get_alphabet() == a.get_alphabet() and
-            self.get_epsilons() == a.get_epsilons() and
-            self.get_states() == a.get_states() and
-            self.get_initial_states() == a.get_initial_states() and
-            self.get_final_states() == a.get_final_states() and
-            self.get_transitions() == a.get_transitions()
+        msg = (
+            "In automaton module, only deterministic automata have a "
+            "canonical form."
+        )
+        if len( self._initial_states ) > 1:
+            raise Exception( msg )
+        alphabet = tuple( sorted( self._alphabet, key=_sort_key ) )
+        epsilons = tuple( sorted( self._epsilons, key=_sort_key ) )
+        characters = [ 
+            ( i, alphabet[i] ) for i in range( len( alphabet ) )
+            if not alphabet[i] in self._epsilons
+        ]
+        for key in self._adjacence:
+            ends = self._adjacence[ key ]
+            if len( ends ) > 1 or ( 
+                len( ends ) > 0 and key[1] in self._epsilons
+            ):
+                raise Exception( msg )
+        ids = {}
+        order = []
+        for state in self._initial_states:
+            ids[ state ] = 1
+            order.append( state )
+        transitions = []
+        position = 0
+        while position < len( order ):
+            state = order[ position ]
+            position += 1
+            for ( i, character ) in characters:
+                for end in self._adjacence.get( (state, character), () ):
+                    if not end in ids:
+                        ids[ end ] = len( ids ) + 1
+                        order.append( end )
+                    transitions.append( ( ids[ state ], i, ids[ end ] ) )
+        finals = tuple( sorted( 
+            ids[ state ] for state in order if state in self._final_states
+        ) )
+        return ( 
+            alphabet, epsilons, len( order ), finals, tuple( transitions )
         )
 
+    def fingerprint( self ):
+        """
+        Returns a fingerprint of a deterministic automaton: the hexadecimal
+        SHA-256 digest of its canonical form (see canonical_form()).
+
+        The fingerprint does not depend on the names of the states nor on 
+        the Python process, so it can be used as a key of a dictionary, of 
+        a cache or of a file.
+
+        Example:
+
+        >>> a = automaton( initials=['x'], finals=['y'], transitions=[ ('x','a','y') ] )
+        >>> b = automaton( initials=[1], finals=[2], transitions=[ (1,'a',2) ] )
+        >>> a.fingerprint() == b.fingerprint()
+        True
+        >>> len( a.fingerprint() )
+        64
+        """
+        return hashlib.sha256( 
+            repr( self.canonical_form() ).encode( 'utf-8' )
+        ).hexdigest()
+
+    def is_isomorphic( self, a ):
+        """
+        Tests whether the accessible parts of two deterministic automata are
+        isomorphic, by comparing their canonical forms.
+
+        Example:
+
+        >>> a = automaton( initials=['x'], finals=['y'], transitions=[ ('x','a','y') ] )
+        >>> b = automaton( initials=[1], finals=[2], transitions=[ (1,'a',2) ] )
+        >>> a.is_isomorphic( b ) and not a == b
+        True
+        >>> b.add_final_state( 1 )
+        >>> a.is_isomorphic( b )
+        False
+        """
+        return self.canonical_form() == a.canonical_form()
+
     def clone( self ):
         """
-        Returns a deep copy of the automaton.
+        Returns a copy of the automaton.
+
+        The copy is made in constant time: the two automata share their
+        sets of states, their alphabets and their transitions until one of 
+        them is modified. The first modification of a set copies that set
+        only, and adding or removing a transition copies the transitions
+        of the modified pair (state, character) only.
 
         Example:
 
@@ -461,8 +1012,62 @@ class automaton:
         False
         >>> b == a
         True
+        >>> b.add_transition( (1,'a',0) )
+        >>> a.get_transitions() == set( [ (0,'a',0), (0,'a',1) ] )
+        True
+        >>> b.get_transitions() == set( [ (0,'a',0), (0,'a',1), (1,'a',0) ] )
+        True
         """
-        return copy.deepcopy( self )
+        if instrumentation.running:
+            instrumentation.count( 'clones' )
+        result = self.__class__.__new__( self.__class__ )
+        result.__dict__.update( self.__dict__ )
+        shared = set( self._shared_attributes )
+        self._shared = shared
+        self._owned_buckets = set()
+        result._shared = set( shared )
+        result._owned_buckets = set()
+        return result
+
+    def _writable( self, name ):
+        # Returns the container ``name``, copying it first if it is shared
+        # with another automaton. The container is about to be modified, so
+        # the version of the automaton is dropped.
+        self._version = None
+        if name in self._shared:
+            setattr( self, name, copy.copy( getattr( self, name ) ) )
+            self._shared = self._shared - set( [name] )
+        return getattr( self, name )
+
+    def _writable_bucket( self, key ):
+        # Returns the set of the transitions of ``key`` = (state, character),
+        # copying it first if it is shared with another automaton.
+        adjacence = self._writable( '_adjacence' )
+        if self._owned_buckets == None:
+            if not key in adjacence:
+                adjacence[ key ] = set( )
+        elif not key in self._owned_buckets:
+            adjacence[ key ] = set( adjacence.get( key, () ) )
+            self._owned_buckets.add( key )
+        return adjacence[ key ]
+
+    def _release( self, *names ):
+        # Must be called after the containers ``names`` have been replaced
+        # by new containers.
+        self._version = None
+        self._shared = self._shared - set( names )
+        if '_adjacence' in names:
+            self._owned_buckets = None
+
+    def _get_version( self ):
+        # Returns a token identifying the current content of the automaton:
+        # it is replaced after every modification, and shared by clone() 
+        # until one of the automata is modified. Tokens are compared by 
+        # identity, so a token kept by the caller is never reused. Data
+        # depending only on the content can be memoized in its ``key``.
+        if self._version == None:
+            self._version = _version_token()
+        return self._version
 
     def get_renumbered_automaton( self ):
         """
@@ -530,6 +1135,13 @@ class automaton:
         self._states = states
         self._final_states = finals
         self._adjacence = transitions
+        self._release(
+            '_states', '_initial_states', '_final_states', '_adjacence'
+        )
+        self._closures = None
+        self._maximal_id = None
+        if len( states ) > 0:
+            self._maximal_id = len( states )
 
     def add_initial_state( self, state ):
         """
@@ -547,7 +1159,8 @@ class automaton:
         True
         """
         self.add_state( state )
-        self._initial_states.add( state ) 
+        if not state in self._initial_states:
+            self._writable( '_initial_states' ).add( state )
 
     def add_initial_states( self, list_of_states ):
         """
@@ -583,7 +1196,8 @@ class automaton:
         True
         """
         self.add_state( state )
-        self._final_states.add( state ) 
+        if not state in self._final_states:
+            self._writable( '_final_states' ).add( state )
 
     def add_final_states( self, list_of_states ):
         """
@@ -647,7 +1261,9 @@ class automaton:
         
         """
         _test_is_hashable( state, "States" )
-        self._states.add( state )
+        if not state in self._states:
+            self._writable( '_states' ).add( state )
+            self._update_maximal_id( state )
 
     def add_states( self, list_of_states ):
         """
@@ -702,7 +1318,8 @@ class automaton:
         >>> a.add_character( (1,2,5) )
         """
         _test_is_hashable( character, "Characters" )
-        self._alphabet.add( character )
+        if not character in self._alphabet:
+            self._writable( '_alphabet' ).add( character )
 
     def add_characters( self, list_of_characters ):
         """
@@ -759,7 +1376,9 @@ class automaton:
         """
         _test_is_hashable( character, "Epsilon characters" )
         self.add_character( character )
-        self._epsilons.add( character )
+        if not character in self._epsilons:
+            self._writable( '_epsilons' ).add( character )
+        self._closures = None
 
     def add_epsilon_characters( self, list_of_characters ):
         """
@@ -792,9 +1411,13 @@ class automaton:
         self.add_state( q1 )
         self.add_state( q2 )
         self.add_character( lettre )
-        if( not (q1,lettre) in self._adjacence ):
-            self._adjacence[ (q1, lettre) ] = set( )
-        self._adjacence[ (q1, lettre) ].add( q2 )
+        if q2 in self._adjacence.get( (q1, lettre), () ):
+            return
+        self._writable_bucket( (q1, lettre) ).add( q2 )
+        if instrumentation.running:
+            instrumentation.count( 'transitions_added' )
+        if lettre in self._epsilons:
+            self._closures = None
 
     def add_transitions( self, list_of_transitions ):
         """
@@ -891,6 +1514,80 @@ class automaton:
         True
         """
         return state in self._final_states
+    def states_view( self ):
+        """
+        Returns a read-only view on the states, without copying them.
+
+        Example:
+        
+        >>> a = automaton( states= [1,2,3,4] )
+        >>> a.states_view() == set( [1,2,3,4] )
+        True
+        """
+        return automaton_set_view( self, '_states' )
+
+    def initial_states_view( self ):
+        """
+        Returns a read-only view on the initial states, without copying them.
+
+        Example:
+        
+        >>> a = automaton( states=[1,2,3,4], initials=[ 1,3 ] )
+        >>> a.initial_states_view() == set( [ 1, 3 ] )
+        True
+        """
+        return automaton_set_view( self, '_initial_states' )
+
+    def final_states_view( self ):
+        """
+        Returns a read-only view on the final states, without copying them.
+
+        Example:
+        
+        >>> a = automaton( states=[1,2,3,4], finals=[ 1,3 ] )
+        >>> a.final_states_view() == set( [ 1, 3 ] )
+        True
+        """
+        return automaton_set_view( self, '_final_states' )
+
+    def alphabet_view( self ):
+        """
+        Returns a read-only view on the alphabet, without copying it.
+
+        Example:
+        
+        >>> a = automaton( alphabet=['a','b'], epsilons=['0'] )
+        >>> a.alphabet_view() == set( ['a','b','0'] )
+        True
+        """
+        return automaton_set_view( self, '_alphabet' )
+
+    def epsilons_view( self ):
+        """
+        Returns a read-only view on the epsilon characters, without copying 
+        them.
+
+        Example:
+        
+        >>> a = automaton( alphabet=['a','b'], epsilons=['0'] )
+        >>> a.epsilons_view() == set( ['0'] )
+        True
+        """
+        return automaton_set_view( self, '_epsilons' )
+
+    def transitions_view( self ):
+        """
+        Returns a read-only view on the transitions. The transitions are 
+        generated on the fly, when the view is iterated.
+
+        Example:
+        
+        >>> a = automaton( transitions= [ (0,'a',1), (1,'b',1), (1,'a',0) ] )
+        >>> a.transitions_view() == set( [ (0,'a',1), (1,'b',1), (1,'a',0) ] )
+        True
+        """
+        return automaton_transitions_view( self )
+
     def get_initial_states( self ):
         """
         Returns the list of initial states.
@@ -925,24 +1622,203 @@ class automaton:
         """
         return pretty_set(self._alphabet)
 
+    def get_character_classes( self ):
+        """
+        Returns the partition of the characters that are not epsilon 
+        characters into classes: two characters are in the same class if, 
+        from every state, they lead to the same set of states. The result
+        is a list of pretty_set.
+
+        An algorithm can then handle one character by class, as the byte 
+        classes of RE2: the characters of a class behave the same way in
+        every state. The partition is computed in linear time in the number
+        of transitions.
+
+        Example:
+
+        >>> a = automaton(
+        ...     alphabet=['d'], epsilons=['0'],
+        ...     transitions=[ 
+        ...         (0,'a',1), (0,'b',1), (1,'a',0), (1,'b',0), (1,'c',0)
+        ...     ]
+        ... )
+        >>> set( a.get_character_classes() ) == set( [
+        ...     pretty_set(['a','b']), pretty_set(['c']), pretty_set(['d'])
+        ... ] )
+        True
+        """
+        signatures = {}
+        for character in self._alphabet:
+            if not character in self._epsilons:
+                signatures[ character ] = []
+        for key in self._adjacence:
+            ends = self._adjacence[ key ]
+            if len( ends ) > 0 and key[1] in signatures:
+                signatures[ key[1] ].append( ( key[0], pretty_set( ends ) ) )
+        classes = {}
+        for character in signatures:
+            signature = frozenset( signatures[ character ] )
+            if not signature in classes:
+                classes[ signature ] = []
+            classes[ signature ].append( character )
+        return [ pretty_set( c ) for c in classes.values() ]
+
     def _delta( self, character, states ):
+        if instrumentation.running:
+            instrumentation.count( 'delta_calls' )
         result = set()
         for state in states:
             if (state,character) in self._adjacence:
                 result.update( self._adjacence[ (state,character) ] )
         return pretty_set( result )
 
+    def _epsilon_successors( self, state ):
+        result = []
+        for eps in self._epsilons:
+            if (state, eps) in self._adjacence:
+                result.extend( self._adjacence[ (state, eps) ] )
+        return result
+
+    def _compute_closures( self ):
+        # Tarjan's algorithm on the graph of the epsilon transitions. Returns
+        # the condensation of this graph: the component of each state, the 
+        # members of each component and the components directly reachable 
+        # from each component. The members of a component are shared by all
+        # of them, and the closures are expanded on demand by walking the
+        # condensation (see _expand_epsilons()), so the memory stays linear
+        # even when the closures are quadratic (long chains of epsilons).
+        component_of = {}
+        members = []
+        next_components_of = []
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        iterations = 0
+        for root in self._states:
+            if root in index:
+                continue
+            index[ root ] = low[ root ] = len( index )
+            stack.append( root )
+            on_stack.add( root )
+            work = [ ( root, iter( self._epsilon_successors( root ) ) ) ]
+            while len( work ) > 0:
+                iterations += 1
+                ( state, successors ) = work[-1]
+                advanced = False
+                for end in successors:
+                    if not end in index:
+                        index[ end ] = low[ end ] = len( index )
+                        stack.append( end )
+                        on_stack.add( end )
+                        work.append(
+                            ( end, iter( self._epsilon_successors( end ) ) )
+                        )
+                        advanced = True
+                        break
+                    elif end in on_stack:
+                        low[ state ] = min( low[ state ], index[ end ] )
+                if advanced:
+                    continue
+                work.pop()
+                if len( work ) > 0:
+                    parent = work[-1][0]
+                    low[ parent ] = min( low[ parent ], low[ state ] )
+                if low[ state ] == index[ state ]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard( member )
+                        component.add( member )
+                        if member == state:
+                            break
+                    number = len( members )
+                    for member in component:
+                        component_of[ member ] = number
+                    # The components are found in reverse topological order:
+                    # the successors of this one are already numbered.
+                    next_components = set()
+                    for member in component:
+                        for end in self._epsilon_successors( member ):
+                            if component_of[ end ] != number:
+                                next_components.add( component_of[ end ] )
+                    members.append( component )
+                    next_components_of.append( tuple( next_components ) )
+        if instrumentation.running:
+            instrumentation.count( 'closure_iterations', iterations )
+        return ( component_of, members, next_components_of )
+
+    def get_epsilon_closure( self, state ):
+        """
+        Returns the set of states connected with ``state`` by a path of
+        epsilon transitions.
+
+        The strongly connected components of the epsilon transitions are 
+        computed once and kept until the epsilon transitions change; the 
+        closures are expanded from them when they are needed.
+
+        Example:
+
+        >>> a = automaton(
+        ...     epsilons=['0'],
+        ...     transitions=[ (0,'0',1), (1,'0',2), (2,'0',1), (2,'a',3) ]
+        ... )
+        >>> a.get_epsilon_closure( 0 ) == set( [0,1,2] )
+        True
+        >>> a.get_epsilon_closure( 2 ) == set( [1,2] )
+        True
+        >>> a.add_transition( (3,'0',0) )
+        >>> a.get_epsilon_closure( 3 ) == set( [0,1,2,3] )
+        True
+
+        A long chain of epsilon transitions is handled in linear memory:
+
+        >>> chain = automaton(
+        ...     epsilons=['0'], initials=[0], finals=['end'],
+        ...     transitions=[ (i,'0',i+1) for i in range( 20000 ) ]
+        ...         + [ (20000,'a','end') ]
+        ... )
+        >>> chain.word_is_recognized( ['a'] )
+        True
+        >>> len( chain.get_epsilon_closure( 0 ) )
+        20001
+        """
+        return self._expand_epsilons( [state] )
+
     def _expand_epsilons( self, states):
-        old = pretty_set( )
-        result = pretty_set( states )
-        while( old != result ):
-            old = result
-            for eps in self._epsilons:
-                result = result.union(
-                    self._delta( eps, result )
-                )
+        if instrumentation.running:
+            states = list( states )
+            instrumentation.count( 'closure_iterations', len( states ) )
+        result = set( states )
+        self._close_epsilons( result )
         return pretty_set(result)
 
+    def _close_epsilons( self, states ):
+        # Adds in place, to the set ``states``, the states reachable from 
+        # them by epsilon transitions. Returns nothing.
+        if self._closures == None:
+            self._closures = self._compute_closures()
+        ( component_of, members, next_components_of ) = self._closures
+        seen = set()
+        todo = []
+        for state in states:
+            number = component_of.get( state )
+            # A component reduced to ``state``, without epsilon successor,
+            # adds nothing.
+            if number != None and not number in seen and (
+                len( next_components_of[ number ] ) > 0 or 
+                len( members[ number ] ) > 1
+            ):
+                seen.add( number )
+                todo.append( number )
+        while len( todo ) > 0:
+            number = todo.pop()
+            states.update( members[ number ] )
+            for next_number in next_components_of[ number ]:
+                if not next_number in seen:
+                    seen.add( next_number )
+                    todo.append( next_number )
+
     def remove_epsilon_transitions( self ):
         """
         Removes all the epsilon transition
@@ -957,6 +1833,8 @@ class automaton:
         True
         """
         self._epsilons = set()
+        self._release( '_epsilons' )
+        self._closures = None
 
     def delta( self, character, states=None, ignore_epsilons=False ):
         """
@@ -1119,7 +1997,10 @@ class automaton:
         else:
             result = self._expand_epsilons( states )
             for character in word:
-                result = self.delta( character, result )
+                if not character in self._epsilons:
+                    result = self._expand_epsilons(
+                        self._delta( character, result )
+                    )
             return pretty_set(result)
 
     def word_is_recognized(
@@ -1194,48 +2075,315 @@ class automaton:
                 return True
         return False
 
-    def to_dot( self, title=None ):
+    def shortest_word( self ):
         """
-        Returns the string containing the dot format of the automaton.
+        Returns a shortest word recognized by the automaton, as a list of
+        characters, or None if the automaton recognizes no word.
+
+        The states are visited in breadth first order from the epsilon 
+        closure of the initial states; the states of the epsilon closure of
+        a state are reached by the same word. The search stops at the first 
+        final state.
 
         Example:
 
-        >>> a = automaton()
-        >>> print( a.to_dot() )
-        <BLANKLINE>
-        digraph G {
-        }
-        
+        >>> a = automaton(
+        ...     epsilons=['0'], initials=[0], finals=[3],
+        ...     transitions=[ 
+        ...         (0,'a',1), (1,'a',2), (2,'a',3), (0,'b',4), (4,'0',3)
+        ...     ]
+        ... )
+        >>> a.shortest_word()
+        ['b']
+        >>> automaton( initials=[0], finals=[1] ).shortest_word() == None
+        True
+        """
+        letters = _letters( self )
+        words = {}
+        queue = deque()
+        for state in self._expand_epsilons( self._initial_states ):
+            words[ state ] = None
+            queue.append( state )
+        while len( queue ) > 0:
+            state = queue.popleft()
+            if state in self._final_states:
+                return _word( words[ state ] )
+            for character in letters:
+                if not (state, character) in self._adjacence:
+                    continue
+                ends = self._adjacence[ (state, character) ]
+                for end in self._expand_epsilons( ends ):
+                    if not end in words:
+                        words[ end ] = ( words[ state ], character )
+                        queue.append( end )
+        return None
+
+    def is_empty( self ):
         """
-        state_to_id = _object_to_id()
-        for state in self._states:
-            state_to_id.add_object( state )
-        result = ""
-        result += '\ndigraph G {'
-        if( title != None ):
-            result += '\n\t// title'
-            result += '\n\tlabelloc="t";'
-            result += '\n\tlabel="' + str(title) + '";'
-        for origin in self._states:
-            for character in self._alphabet:
-                if( (origin,character) in self._adjacence ):
-                    for end in self._adjacence[ (origin, character) ]:
-                        result += (
-                            '\n\t' + str(state_to_id.id(origin)) + '->' + 
-                            str(state_to_id.id(end)) + ' [label=' +
-                            str(character) + ', shape=normal]'
-                        )
-        for state in self._states:
-            if state in self._final_states and state in self._initial_states:
-                result += (
-                    '\n\t' + str(state_to_id.id(state)) + 
-                    ' [margin=0.0, shape=diamond, peripheries=2, label="' +
-                    str(state) + '"];'
-                )
-            elif state in self._final_states:
-                result += (
-                    '\n\t' + str(state_to_id.id(state)) + 
-                    ' [margin=0.0, shape=oval, peripheries=2, label="' +
+        Returns True if the automaton recognizes no word. See shortest_word().
+
+        Example:
+
+        >>> a = automaton( initials=[0], finals=[2], transitions=[ (0,'a',1) ] )
+        >>> a.is_empty()
+        True
+        >>> a.add_transition( (1,'b',2) )
+        >>> a.is_empty()
+        False
+        """
+        return self.shortest_word() == None
+
+    def intersection_is_empty( self, a ):
+        """
+        Returns True if no word is recognized by both automata.
+
+        The product automaton is not built: the pairs of states are visited
+        in breadth first order, and the search stops as soon as a pair of 
+        final states is reached.
+
+        Example:
+
+        >>> a = automaton(
+        ...     initials=[0], finals=[0], transitions=[ (0,'a',1), (1,'a',0) ]
+        ... )
+        >>> b = automaton(
+        ...     epsilons=['0'], initials=[0], finals=[3], transitions=[ 
+        ...         (0,'a',1), (1,'a',2), (2,'a',1), (1,'0',3)
+        ...     ]
+        ... )
+        >>> a.intersection_is_empty( b )
+        True
+        >>> b.add_transition( (3,'a',4) )
+        >>> b.add_final_state( 4 )
+        >>> a.intersection_is_empty( b )
+        False
+        """
+        letters = _letters( self, a )
+        def successors( aut, state, character ):
+            if character in aut._epsilons:
+                return ( state, )
+            return aut._expand_epsilons( aut._delta( character, [state] ) )
+        visited = set()
+        queue = deque()
+        def visit( states_1, states_2 ):
+            for state_1 in states_1:
+                for state_2 in states_2:
+                    if not (state_1, state_2) in visited:
+                        visited.add( (state_1, state_2) )
+                        queue.append( (state_1, state_2) )
+        visit(
+            self._expand_epsilons( self._initial_states ),
+            a._expand_epsilons( a._initial_states )
+        )
+        while len( queue ) > 0:
+            ( state_1, state_2 ) = queue.popleft()
+            if state_1 in self._final_states and state_2 in a._final_states:
+                return False
+            for character in letters:
+                ends_1 = successors( self, state_1, character )
+                if len( ends_1 ) > 0:
+                    visit( ends_1, successors( a, state_2, character ) )
+        return True
+
+    def difference_is_empty( self, a ):
+        """
+        Returns True if every word recognized by the automaton is also 
+        recognized by ``a``, that is if the language of the automaton minus
+        the language of ``a`` is empty. 
+
+        Neither the complement of ``a`` nor the product is built: see 
+        includes().
+
+        Example:
+
+        >>> a = automaton( initials=[0], finals=[1], transitions=[ (0,'a',1) ] )
+        >>> b = automaton( initials=[0], finals=[0], transitions=[ (0,'a',0) ] )
+        >>> a.difference_is_empty( b )
+        True
+        >>> b.difference_is_empty( a )
+        False
+        """
+        return includes( self, a )[0]
+
+    def compile( self ):
+        """
+        Returns a compiled_automaton recognizing the same words.
+
+        The states are renumbered as in renumber_the_states(), the alphabet
+        is interned and the transitions are stored in an array of integers.
+        The characters of a same class (see get_character_classes()) share
+        a column of the table.
+        The automaton has to be deterministic: at most one initial state,
+        no epsilon transition and at most one transition by state and 
+        character.
+
+        Example:
+
+        >>> a = automaton(
+        ...     epsilons=['0'], initials=[0], finals=[2],
+        ...     transitions=[ (0,'a',1), (1,'b',2), (2,'a',1) ]
+        ... )
+        >>> c = a.compile()
+        >>> c.get_number_of_states()
+        3
+        >>> c.get_table()[1]
+        3
+        >>> c.match( 'ab' ) and c.match( 'a0b' ) and not c.match( 'aba' )
+        True
+        >>> automaton( transitions=[ (0,'a',1), (0,'a',2) ] ).compile()
+        Traceback (most recent call last):
+            ...
+        Exception: In automaton module, only deterministic automata can be compiled.
+        """
+        msg = "In automaton module, only deterministic automata can be compiled."
+        if len( self._initial_states ) > 1:
+            raise Exception( msg )
+        state_to_id = _object_to_id()
+        for state in self._states:
+            state_to_id.add_object( state )
+        columns = {}
+        width = 1
+        for character in self._epsilons:
+            columns[ character ] = 0
+        representatives = set()
+        for characters in self.get_character_classes():
+            for character in characters:
+                columns[ character ] = width
+            representatives.add( next( iter( characters ) ) )
+            width += 1
+        nb_states = len( self._states )
+        table = array( 'i', [0] ) * ( (nb_states+1)*width )
+        for state in range( nb_states+1 ):
+            table[ state*width ] = state
+        for key in self._adjacence:
+            ends = self._adjacence[ key ]
+            if len( ends ) == 0:
+                continue
+            if len( ends ) > 1 or key[1] in self._epsilons:
+                raise Exception( msg )
+            if not key[1] in representatives:
+                continue
+            for end in ends:
+                table[ state_to_id.id( key[0] )*width + columns[ key[1] ] ] = (
+                    state_to_id.id( end )
+                )
+        finals = bytearray( nb_states+1 )
+        for state in self._final_states:
+            finals[ state_to_id.id( state ) ] = 1
+        initial = 0
+        for state in self._initial_states:
+            initial = state_to_id.id( state )
+        states = [ None ] * ( nb_states+1 )
+        for state in self._states:
+            states[ state_to_id.id( state ) ] = state
+        return compiled_automaton(
+            columns, width, table, finals, initial, states, self._epsilons
+        )
+
+    def matcher( self, ignore_epsilons=False ):
+        """
+        Returns a stream_matcher reading the words of the automaton chunk by
+        chunk. See stream_matcher.
+
+        Keyword arguments:
+        ignore_epsilons -- if set to True, all the epsilon charaters will be
+                           considerated as usal characters
+
+        Example:
+
+        >>> a = automaton(
+        ...     initials=[0], finals=[1], transitions=[ (0,'a',1), (0,'a',0) ]
+        ... )
+        >>> m = a.matcher()
+        >>> for chunk in [ 'aa', '', 'a' ]:
+        ...     m.feed( chunk )
+        >>> m.is_accepting()
+        True
+        """
+        return stream_matcher( self, ignore_epsilons )
+
+    def lazy_dfa( self, max_states=10000, max_bytes=None ):
+        """
+        Returns a lazy_dfa recognizing the words of the automaton, whose 
+        deterministic states are built on demand. See lazy_dfa.
+
+        Keyword arguments:
+        max_states -- the maximal number of cached states [default=10000]
+        max_bytes -- the memory budget of the cache [default=None]
+
+        Example:
+
+        >>> a = automaton(
+        ...     initials=[0], finals=[1], transitions=[ (0,'a',1), (0,'a',0) ]
+        ... )
+        >>> d = a.lazy_dfa()
+        >>> d.match( 'aaa' ) and not d.match( '' )
+        True
+        """
+        return lazy_dfa( self, max_states, max_bytes )
+
+    def recognize_many( self, words ):
+        """
+        Returns, for each word of ``words``, whether it is recognized by the
+        automaton. See compiled_automaton.recognize_many(): the result is
+        a NumPy array of booleans if NumPy is available, and a list of 
+        booleans otherwise.
+
+        The automaton has to be deterministic.
+
+        Example:
+
+        >>> a = automaton(
+        ...     initials=[0], finals=[1],
+        ...     transitions=[ (0,'a',1), (1,'b',0) ]
+        ... )
+        >>> [ bool( r ) for r in a.recognize_many( [ 'ab', 'aba' ] ) ]
+        [False, True]
+        """
+        return self.compile().recognize_many( words )
+
+    def to_dot( self, title=None ):
+        """
+        Returns the string containing the dot format of the automaton.
+
+        Example:
+
+        >>> a = automaton()
+        >>> print( a.to_dot() )
+        <BLANKLINE>
+        digraph G {
+        }
+        
+        """
+        state_to_id = _object_to_id()
+        for state in self._states:
+            state_to_id.add_object( state )
+        result = ""
+        result += '\ndigraph G {'
+        if( title != None ):
+            result += '\n\t// title'
+            result += '\n\tlabelloc="t";'
+            result += '\n\tlabel="' + str(title) + '";'
+        for origin in self._states:
+            for character in self._alphabet:
+                if( (origin,character) in self._adjacence ):
+                    for end in self._adjacence[ (origin, character) ]:
+                        result += (
+                            '\n\t' + str(state_to_id.id(origin)) + '->' + 
+                            str(state_to_id.id(end)) + ' [label=' +
+                            str(character) + ', shape=normal]'
+                        )
+        for state in self._states:
+            if state in self._final_states and state in self._initial_states:
+                result += (
+                    '\n\t' + str(state_to_id.id(state)) + 
+                    ' [margin=0.0, shape=diamond, peripheries=2, label="' +
+                    str(state) + '"];'
+                )
+            elif state in self._final_states:
+                result += (
+                    '\n\t' + str(state_to_id.id(state)) + 
+                    ' [margin=0.0, shape=oval, peripheries=2, label="' +
                     str(state) + '"];'
                 )
             elif state in self._initial_states:
@@ -1283,6 +2431,978 @@ class automaton:
             a = threading.Thread( target=render_with_dotty )
             a.start()
 
+def _read( aut, states, character ):
+    # Returns the epsilon closure of the states reached from ``states`` by
+    # reading ``character``. Reading an epsilon character does nothing, as
+    # in delta_star().
+    if character in aut._epsilons:
+        return states
+    return aut._expand_epsilons( aut._delta( character, states ) )
+
+def _letters( *automata ):
+    # Returns the sorted list of the characters that are not epsilon 
+    # characters in at least one of the automata.
+    result = set()
+    for aut in automata:
+        result.update( aut._alphabet - aut._epsilons )
+    return sorted( result, key=_sort_key )
+
+def _word( node ):
+    # The words of the breadth first searches are stored as linked lists
+    # ( prefix, last character ), None being the empty word.
+    result = []
+    while node != None:
+        ( node, character ) = node
+        result.append( character )
+    result.reverse()
+    return result
+
+def equivalent( a, b ):
+    """
+    Tests whether two automata recognize the same language.
+
+    The function uses the algorithm of Hopcroft and Karp: the two automata 
+    are determinized on the fly, together, in breadth first order, and a 
+    union-find structure merges the pairs of subsets that are assumed to be 
+    equivalent, so that a pair is explored only if it is not already known 
+    to be equivalent. The search stops at the first pair of subsets whose 
+    acceptance differs. The automata may be non deterministic and may have 
+    epsilon transitions.
+
+    The result is the pair (True, None) if the languages are equal, and 
+    (False, w) otherwise, where w is a list of characters recognized by only
+    one of the two automata. As the search is a breadth first search, w is 
+    short, but the union-find pruning does not guarantee it is the shortest
+    distinguishing word.
+
+    Example:
+
+    >>> a = automaton(
+    ...     initials=[0], finals=[0], transitions=[ (0,'a',1), (1,'a',0) ]
+    ... )
+    >>> b = automaton(
+    ...     epsilons=['0'], initials=[0], finals=[3], transitions=[ 
+    ...         (0,'0',3), (3,'a',1), (1,'a',2), (2,'a',1), (1,'a',3)
+    ...     ]
+    ... )
+    >>> equivalent( a, b )
+    (True, None)
+    >>> b.add_transition( (2,'a',4) )
+    >>> b.add_final_state( 4 )
+    >>> equivalent( a, b )
+    (False, ['a', 'a', 'a'])
+    """
+    letters = _letters( a, b )
+    start = ( 
+        a._expand_epsilons( a._initial_states ),
+        b._expand_epsilons( b._initial_states )
+    )
+    parent = {}
+    def find( node ):
+        root = node
+        while root in parent:
+            root = parent[ root ]
+        while node != root:
+            following = parent[ node ]
+            parent[ node ] = root
+            node = following
+        return root
+    parent[ (0, start[0]) ] = (1, start[1])
+    queue = deque( [ ( start, None ) ] )
+    while len( queue ) > 0:
+        ( ( states_a, states_b ), word ) = queue.popleft()
+        if (
+            states_a.isdisjoint( a._final_states ) != 
+            states_b.isdisjoint( b._final_states )
+        ):
+            return ( False, _word( word ) )
+        for character in letters:
+            next_a = _read( a, states_a, character )
+            next_b = _read( b, states_b, character )
+            root_a = find( (0, next_a) )
+            root_b = find( (1, next_b) )
+            if root_a != root_b:
+                parent[ root_a ] = root_b
+                queue.append( ( (next_a, next_b), (word, character) ) )
+    return ( True, None )
+
+def _add_to_antichain( antichain, states ):
+    # Adds ``states`` to the set ``antichain`` of minimal sets, unless
+    # a subset of ``states`` is already in it, and removes the supersets of
+    # ``states``. Returns True if the set has been added.
+    if states in antichain or any( map( states.issuperset, antichain ) ):
+        return False
+    antichain.difference_update( list( filter( states.issubset, antichain ) ) )
+    antichain.add( states )
+    return True
+
+def includes( a, b ):
+    """
+    Tests whether the language of ``a`` is included in the language of 
+    ``b``.
+
+    The function uses the antichain algorithm: it explores, in breadth 
+    first order, the pairs (p, S) where p is a state of ``a`` and S is the 
+    set of states of ``b`` reached by the same word. A pair (p, S) is 
+    pruned when a pair (p, S') with S' included in S has already been 
+    found, since every counterexample from (p, S) is also a counterexample
+    from (p, S'). Neither ``b`` nor its complement is built, and the search
+    stops at the first counterexample: a pair (p, S) where p is final and 
+    S contains no final state. The automata may have epsilon transitions.
+
+    The result is the pair (True, None) if the inclusion holds, and 
+    (False, w) otherwise, where w is a list of characters recognized by 
+    ``a`` and not by ``b``.
+
+    Example:
+
+    >>> a = automaton(
+    ...     initials=[0], finals=[2], transitions=[ (0,'a',1), (1,'b',2) ]
+    ... )
+    >>> b = automaton(
+    ...     initials=[0], finals=[1], transitions=[ 
+    ...         (0,'a',0), (0,'b',0), (0,'b',1)
+    ...     ]
+    ... )
+    >>> includes( a, b )
+    (True, None)
+    >>> includes( b, a )
+    (False, ['b'])
+    """
+    letters = _letters( a )
+    start = b._expand_epsilons( b._initial_states )
+    # The successors are memoized: the same state of ``a`` and the same 
+    # set of states of ``b`` appear in many pairs.
+    successors_a = {}
+    successors_b = {}
+    antichains = {}
+    queue = deque()
+    for state in a._expand_epsilons( a._initial_states ):
+        antichains[ state ] = set( [ start ] )
+        queue.append( ( state, start, None ) )
+    while len( queue ) > 0:
+        ( state, states, word ) = queue.popleft()
+        if not states in antichains[ state ]:
+            continue
+        if state in a._final_states and states.isdisjoint( b._final_states ):
+            return ( False, _word( word ) )
+        for character in letters:
+            key = ( state, character )
+            if not key in successors_a:
+                successors_a[ key ] = a._expand_epsilons( 
+                    a._delta( character, [state] ) 
+                )
+            next_states = None
+            for end in successors_a[ key ]:
+                if next_states == None:
+                    key = ( states, character )
+                    if not key in successors_b:
+                        successors_b[ key ] = _read( b, states, character )
+                    next_states = successors_b[ key ]
+                if not end in antichains:
+                    antichains[ end ] = set()
+                if _add_to_antichain( antichains[ end ], next_states ):
+                    queue.append( ( end, next_states, (word, character) ) )
+    return ( True, None )
+
+def is_universal( a ):
+    """
+    Tests whether the automaton recognizes all the words over its alphabet 
+    (the epsilon characters excluded).
+
+    The function uses the antichain algorithm: the sets of states reached
+    by the words are explored in breadth first order, and a set is pruned 
+    when one of its subsets has already been found. The search stops at 
+    the first set containing no final state.
+
+    The result is the pair (True, None) if the automaton is universal, and 
+    (False, w) otherwise, where w is a list of characters that is not 
+    recognized.
+
+    Example:
+
+    >>> a = automaton(
+    ...     epsilons=['0'], initials=[0], finals=[1], transitions=[ 
+    ...         (0,'0',1), (1,'a',1), (1,'b',0)
+    ...     ]
+    ... )
+    >>> is_universal( a )
+    (True, None)
+    >>> a.add_character( 'c' )
+    >>> is_universal( a )
+    (False, ['c'])
+    """
+    letters = _letters( a )
+    start = a._expand_epsilons( a._initial_states )
+    antichain = set( [ start ] )
+    queue = deque( [ ( start, None ) ] )
+    while len( queue ) > 0:
+        ( states, word ) = queue.popleft()
+        if not states in antichain:
+            continue
+        if states.isdisjoint( a._final_states ):
+            return ( False, _word( word ) )
+        for character in letters:
+            next_states = _read( a, states, character )
+            if _add_to_antichain( antichain, next_states ):
+                queue.append( ( next_states, (word, character) ) )
+    return ( True, None )
+
+_BINARY_MAGIC = b'AUTC'
+_BINARY_VERSION = 1
+
+class compiled_automaton:
+    """
+    This class implements a frozen, table driven version of a deterministic
+    automaton.
+
+    The states are renumbered from 1 to n and 0 is the dead state. Every
+    character is interned into a column of a flat transition table, the 
+    column 0 being reserved to the epsilon characters (it maps each state to 
+    itself). Several characters can share a column (see 
+    automaton.get_character_classes()).
+
+    The table is kept as an array('i'). The first call to run() or match()
+    splits it into one list by state, indexed by the columns, so that 
+    reading a character is a dictionary lookup (its column) followed by a 
+    list lookup, and allocates nothing. The rows have one entry by column,
+    not by character.
+
+    Instances are built with automaton.compile().
+
+    Example:
+
+    >>> a = automaton(
+    ...     initials=[0], finals=[1],
+    ...     transitions=[ (0,'a',1), (1,'b',0) ]
+    ... )
+    >>> c = a.compile()
+    >>> c.match( ['a','b','a'] )
+    True
+    >>> c.match( 'ab' )
+    False
+    >>> c.match( 'ac' )
+    False
+    >>> c.get_state( c.run( 'aba' ) )
+    1
+    >>> c.run( 'aa' )
+    0
+    """
+    def __init__(
+        self, columns, width, table, finals, initial, states=None,
+        epsilons=None, direct=False
+    ):
+        """
+        The constructor of the compiled_automaton class.
+
+        Keyword arguments:
+        columns -- a dictionary mapping each character to its column
+        width -- the number of columns of the transition table
+        table -- the transition table, the image of the state s by the
+                 character of column c is stored at table[ s*width + c ]
+        finals -- the final state bitmap, finals[s] is 1 if s is final
+        initial -- the initial state (0 if there is no initial state)
+        states -- the list mapping every integer to its original state
+                  [default=None]
+        epsilons -- the epsilon characters [default=None]
+        direct -- if set to True, run() and match() read the table itself
+                  instead of deriving rows from it [default=False]
+        """
+        self._direct = direct
+        self._columns = columns
+        self._width = width
+        self._table = table
+        self._finals = finals
+        self._initial = initial
+        self._states = states
+        if epsilons == None:
+            epsilons = []
+        self._epsilons = pretty_set( epsilons )
+        self._rows = None
+        self._buffer = None
+
+    def get_number_of_states( self ):
+        """
+        Returns the number of states, the dead state excluded.
+        """
+        return len( self._finals ) - 1
+
+    def get_initial_state( self ):
+        """
+        Returns the integer of the initial state.
+        """
+        return self._initial
+
+    def get_state( self, state ):
+        """
+        Returns the original state numbered by ``state``, or None if it
+        is unknown.
+        """
+        if self._states == None or state == 0:
+            return None
+        return self._states[ state ]
+
+    def state_is_final( self, state ):
+        """
+        Tests whether the integer ``state`` is a final state.
+        """
+        return self._finals[ state ] == 1
+
+    def to_automaton( self ):
+        """
+        Returns an automaton equivalent to the compiled automaton, whose 
+        states are the integers from 1 to n (the dead state is omitted).
+
+        Example:
+
+        >>> a = automaton(
+        ...     epsilons=['0'], initials=[(1,2)], finals=[(3,4)],
+        ...     transitions=[ ((1,2),'a',(3,4)), ((3,4),'b',(1,2)) ]
+        ... )
+        >>> a.compile().to_automaton() == a.get_renumbered_automaton()
+        True
+        """
+        result = automaton( epsilons=self._epsilons )
+        result.add_characters( self._columns )
+        result.add_states( range( 1, len( self._finals ) ) )
+        characters = [
+            ( character, self._columns[ character ] )
+            for character in self._columns 
+            if not character in self._epsilons
+        ]
+        for state in range( 1, len( self._finals ) ):
+            if self._finals[ state ] == 1:
+                result.add_final_state( state )
+            for ( character, column ) in characters:
+                end = self._table[ state*self._width + column ]
+                if end != 0:
+                    result.add_transition( ( state, character, end ) )
+        if self._initial != 0:
+            result.add_initial_state( self._initial )
+        return result
+
+    def save( self, path ):
+        """
+        Saves the compiled automaton in a binary file that can be mapped in 
+        memory by load_compiled_automaton().
+
+        The file contains, in little-endian order:
+        - a header of 32 bytes: the magic string 'AUTC', the version of the
+          format, the number of states (the dead state included), the width
+          of the table, the initial state, the number of characters and the
+          size in bytes of the alphabet table;
+        - the alphabet table: for each character, its column (4 bytes),
+          1 byte set to 1 for an epsilon character, 1 byte giving its type
+          (0 for a string, 1 for an integer), the length of its encoding 
+          (2 bytes) and its UTF-8 encoding; the table is padded to a 
+          multiple of 4 bytes;
+        - the transition table, as 4-bytes signed integers;
+        - the final state bitmap, one byte by state.
+
+        Only strings and integers can be saved as characters.
+        """
+        alphabet = b''
+        for character in self._columns:
+            if type( character ) == str:
+                kind = 0
+            elif type( character ) == int:
+                kind = 1
+            else:
+                raise Exception(
+                    "In automaton module, only strings and integers "
+                    "characters can be saved."
+                )
+            encoding = str( character ).encode( 'utf-8' )
+            alphabet += struct.pack(
+                '<IBBH', self._columns[ character ], 
+                1 if character in self._epsilons else 0, kind, len( encoding )
+            ) + encoding
+        alphabet += b'\0' * ( -len( alphabet ) % 4 )
+        table = array( 'i', self._table )
+        if sys.byteorder != 'little':
+            table.byteswap()
+        with open( path, 'wb' ) as f:
+            f.write(
+                struct.pack(
+                    '<4sIIIIII4x', _BINARY_MAGIC, _BINARY_VERSION,
+                    len( self._finals ), self._width, self._initial,
+                    len( self._columns ), len( alphabet )
+                )
+            )
+            f.write( alphabet )
+            f.write( table.tobytes() )
+            f.write( bytes( self._finals ) )
+
+    def close( self ):
+        """
+        Unmaps the file of a compiled automaton loaded by 
+        load_compiled_automaton(). The compiled automaton can not be used
+        anymore. Does nothing for a compiled automaton built by 
+        automaton.compile().
+
+        A compiled automaton is also a context manager closing it on exit.
+        """
+        if self._buffer == None:
+            return
+        for view in ( self._table, self._finals ):
+            if isinstance( view, memoryview ):
+                view.release()
+        self._buffer.close()
+        self._buffer = None
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.close()
+
+    def matcher( self ):
+        """
+        Returns a stream_matcher reading the words of the automaton chunk by
+        chunk.
+
+        Example:
+
+        >>> a = automaton( initials=[0], finals=[1], transitions=[ (0,'a',1) ] )
+        >>> m = a.compile().matcher()
+        >>> m.feed( 'a' )
+        >>> m.is_accepting()
+        True
+        >>> m.feed( 'a' )
+        >>> m.is_accepting()
+        False
+        """
+        return stream_matcher( self )
+
+    def get_table( self ):
+        """
+        Returns the transition table and its width.
+        """
+        return ( self._table, self._width )
+
+    def _get_rows( self ):
+        # The rows share the integers of ``ids``, so that reading them does
+        # not allocate an int object for the large state numbers.
+        if self._rows == None:
+            ids = list( range( len( self._finals ) ) )
+            table = self._table
+            width = self._width
+            rows = []
+            for state in ids:
+                start = state*width
+                rows.append(
+                    [ ids[ table[ i ] ] for i in range( start, start + width ) ]
+                )
+            self._rows = rows
+        return self._rows
+
+    def run( self, word, state=None ):
+        """
+        Returns the integer of the state reached by reading ``word`` from
+        ``state`` [default=the initial state]. The dead state is 0.
+        """
+        if state == None:
+            state = self._initial
+        try:
+            if self._direct:
+                table = self._table
+                columns = self._columns
+                width = self._width
+                for character in word:
+                    state = table[ state*width + columns[ character ] ]
+            else:
+                rows = self._get_rows()
+                columns = self._columns
+                for character in word:
+                    state = rows[ state ][ columns[ character ] ]
+        except KeyError:
+            return 0
+        return state
+
+    def match( self, word ):
+        """
+        Returns True if the word is recognized by the automaton.
+        """
+        if self._direct:
+            return self._finals[ self.run( word ) ] == 1
+        rows = self._get_rows()
+        columns = self._columns
+        state = self._initial
+        try:
+            for character in word:
+                state = rows[ state ][ columns[ character ] ]
+        except KeyError:
+            return False
+        return self._finals[ state ] == 1
+
+    def _encode_words( self, words ):
+        # Returns the concatenation of the column numbers of all the words,
+        # -1 coding an unknown character.
+        text = None
+        if all( type( word ) == str for word in words ):
+            text = "".join( words )
+        if text != None and all(
+            type( c ) == str and len( c ) == 1 for c in self._columns
+        ):
+            points = numpy.frombuffer(
+                text.encode( 'utf-32-le' ), dtype=numpy.uint32
+            )
+            size = max( [ ord( c ) for c in self._columns ] + [ 0 ] ) + 1
+            lookup = numpy.full( size, -1, dtype=numpy.intp )
+            for character in self._columns:
+                lookup[ ord( character ) ] = self._columns[ character ]
+            codes = numpy.full( len( points ), -1, dtype=numpy.intp )
+            known = points < size
+            codes[ known ] = lookup[ points[ known ] ]
+            return codes
+        get = self._columns.get
+        return numpy.fromiter(
+            ( get( c, -1 ) for word in words for c in word ), 
+            dtype=numpy.intp
+        )
+
+    def recognize_many( self, words ):
+        """
+        Returns, for each word of ``words``, whether it is recognized by the
+        automaton.
+
+        If NumPy is available, the words are encoded into a padded matrix of
+        column numbers (the padding is the epsilon column 0) and all the 
+        words are read together, one column at a time; the result is then a
+        NumPy array of booleans (numpy.ndarray with dtype bool), which stays
+        compact for millions of words. Otherwise the words are read one by 
+        one and the result is a list of booleans. The result can be 
+        converted with ``[ bool( r ) for r in result ]`` when it has to be 
+        the same with and without NumPy (e.g. for json.dumps).
+
+        Example:
+
+        >>> a = automaton(
+        ...     initials=[0], finals=[1],
+        ...     transitions=[ (0,'a',1), (1,'b',0) ]
+        ... )
+        >>> [ bool( r ) for r in a.compile().recognize_many(
+        ...     [ 'a', 'ab', 'aba', '', 'ac', ['a','b','a'] ]
+        ... ) ]
+        [True, False, True, False, False, True]
+        """
+        if numpy == None:
+            return [ self.match( word ) for word in words ]
+        words = list( words )
+        nb_words = len( words )
+        lengths = numpy.fromiter(
+            map( len, words ), dtype=numpy.intp, count=nb_words
+        )
+        codes = self._encode_words( words )
+        length = int( lengths.max() ) if nb_words > 0 else 0
+        rows = numpy.repeat( numpy.arange( nb_words ), lengths )
+        starts = numpy.cumsum( lengths ) - lengths
+        cols = numpy.arange( len( codes ) ) - numpy.repeat( starts, lengths )
+        rejected = numpy.zeros( nb_words, dtype=bool )
+        rejected[ rows[ codes < 0 ] ] = True
+        matrix = numpy.zeros( (nb_words, length), dtype=numpy.intp )
+        matrix[ rows, cols ] = numpy.maximum( codes, 0 )
+        table = numpy.frombuffer( self._table, dtype=numpy.intc ).reshape(
+            -1, self._width
+        )
+        states = numpy.full( nb_words, self._initial, dtype=numpy.intp )
+        for column in range( length ):
+            states = table[ states, matrix[ :, column ] ]
+        finals = numpy.frombuffer( self._finals, dtype=numpy.uint8 )
+        return ( finals[ states ] == 1 ) & ~rejected
+
+
+
+class stream_matcher:
+    """
+    This class implements a matcher reading a word chunk by chunk.
+
+    The matcher keeps only its current state: an integer for a 
+    compiled_automaton, and the set of the current states, closed under the
+    epsilon transitions, for an automaton. An unbounded stream can then be
+    matched in constant memory. The epsilon closures are the ones cached by
+    the automaton (see automaton.get_epsilon_closure()).
+
+    Instances are built with automaton.matcher() or 
+    compiled_automaton.matcher().
+
+    Example:
+
+    >>> a = automaton(
+    ...     epsilons=['0'], initials=[0], finals=[3],
+    ...     transitions=[
+    ...         (0,'0',1), (1,'a',2), (1,'b',3), (2,'0',3), (3,'b',2),
+    ...         (3,'a',0)
+    ...     ]
+    ... )
+    >>> m = a.matcher()
+    >>> m.feed( 'b' )
+    >>> m.is_accepting()
+    True
+    >>> s = m.snapshot()
+    >>> m.feed( ['a', 'a'] )
+    >>> m.is_accepting()
+    True
+    >>> m.feed( 'a' )
+    >>> m.is_accepting()
+    False
+    >>> m.restore( s )
+    >>> m.is_accepting()
+    True
+    >>> m.reset()
+    >>> m.is_accepting()
+    False
+    """
+    def __init__( self, aut, ignore_epsilons=False ):
+        """
+        The constructor of the stream_matcher class.
+
+        Keyword arguments:
+        aut -- an automaton or a compiled_automaton
+        ignore_epsilons -- if set to True, all the epsilon charaters will be
+                           considerated as usal characters [default=False]
+                           (only for an automaton)
+        """
+        self._automaton = aut
+        self._compiled = isinstance( aut, compiled_automaton )
+        self._ignore_epsilons = ignore_epsilons
+        self.reset()
+
+    def _get_epsilons( self ):
+        # The epsilon characters are read from the automaton, so that the
+        # ones added after the construction of the matcher are taken into
+        # account.
+        if self._compiled or self._ignore_epsilons:
+            return ()
+        return self._automaton._epsilons
+
+    def reset( self ):
+        """
+        Goes back to the initial state(s).
+        """
+        if self._compiled:
+            self._current = self._automaton.get_initial_state()
+        else:
+            self._current = set( self._automaton._initial_states )
+            if len( self._get_epsilons() ) > 0:
+                self._automaton._close_epsilons( self._current )
+
+    def feed( self, chunk ):
+        """
+        Reads all the characters of ``chunk``.
+        """
+        if self._compiled:
+            self._current = self._automaton.run( chunk, self._current )
+            return
+        aut = self._automaton
+        adjacence = aut._adjacence
+        epsilons = self._get_epsilons()
+        close = len( epsilons ) > 0
+        current = self._current
+        for character in chunk:
+            if character in epsilons:
+                continue
+            result = set()
+            for state in current:
+                ends = adjacence.get( (state, character) )
+                if ends:
+                    result.update( ends )
+            if close:
+                aut._close_epsilons( result )
+            current = result
+        self._current = current
+
+    def is_accepting( self ):
+        """
+        Returns True if the characters read so far form a recognized word.
+        """
+        if self._compiled:
+            return self._automaton.state_is_final( self._current )
+        return not self._current.isdisjoint( self._automaton._final_states )
+
+    def snapshot( self ):
+        """
+        Returns an immutable copy of the current state of the matcher.
+        """
+        if self._compiled:
+            return self._current
+        return frozenset( self._current )
+
+    def restore( self, snapshot ):
+        """
+        Restores a state returned by snapshot().
+        """
+        if self._compiled:
+            self._current = snapshot
+        else:
+            self._current = set( snapshot )
+
+
+class _lazy_state:
+    """
+    A state of a lazy_dfa: a set of states of the automaton with the
+    transitions already computed from it.
+    """
+    __slots__ = ( 'subset', 'transitions', 'final', 'alive', 'size' )
+
+    def __init__( self, subset, final ):
+        self.subset = subset
+        self.transitions = {}
+        self.final = final
+        self.alive = True
+        self.size = 200 + 50*len( subset )
+
+
+class lazy_dfa:
+    """
+    This class implements a lazy determinisation of an automaton.
+
+    The states of the deterministic automaton (sets of states, closed under
+    the epsilon transitions) are built on demand while words are read and
+    kept in a cache. A transition already computed costs a dictionary 
+    lookup. The cache is bounded by a number of states and by an estimated
+    memory budget, and the least recently used states are evicted first.
+
+    When the cache thrashes (more misses than hits once ``max_states``
+    states have been evicted), the words are read by a direct simulation of
+    the automaton, without cache, until clear() is called.
+
+    Example:
+
+    >>> a = automaton(
+    ...     epsilons=['0'], initials=[0], finals=[3],
+    ...     transitions=[
+    ...         (0,'0',1), (1,'a',2), (1,'b',3), (2,'0',3), (3,'b',2),
+    ...         (3,'a',0)
+    ...     ]
+    ... )
+    >>> d = a.lazy_dfa()
+    >>> d.match( 'baa' ) and d.match( 'b0a0a' ) and not d.match( 'ba' )
+    True
+    >>> d.match( 'baa' )
+    True
+    >>> s = d.get_statistics()
+    >>> s['hits'] > 0 and s['misses'] > 0 and s['evictions'] == 0
+    True
+    >>> d = a.lazy_dfa( max_states=2 )
+    >>> d.match( 'baa' ) and not d.match( 'ba' )
+    True
+    >>> d.get_statistics()['evictions'] > 0
+    True
+
+    A state that is only reached through cached transitions stays in the
+    cache:
+
+    >>> b = automaton(
+    ...     initials=[0], finals=[0],
+    ...     transitions=[ (0,'a',0) ] + [ (0,i,i) for i in range( 1, 6 ) ]
+    ... )
+    >>> d = b.lazy_dfa( max_states=3 )
+    >>> [ d.match( [ 'a', 'a', i ] ) for i in range( 1, 6 ) ]
+    [False, False, False, False, False]
+    >>> d.get_statistics()['misses']
+    6
+    """
+    def __init__( self, aut, max_states=10000, max_bytes=None ):
+        """
+        The constructor of the lazy_dfa class.
+
+        Keyword arguments:
+        aut -- the automaton
+        max_states -- the maximal number of cached states [default=10000]
+        max_bytes -- the memory budget of the cache in bytes, as estimated 
+                     from the size of the cached states [default=None]
+        """
+        self._automaton = aut
+        self._max_states = max_states
+        self._max_bytes = max_bytes
+        self.clear()
+
+    def clear( self ):
+        """
+        Empties the cache and resets the counters.
+        """
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._fallback = False
+        self._initial = None
+
+    def get_statistics( self ):
+        """
+        Returns a dictionary containing the number of hits, misses and 
+        evictions of the cache, the number of cached states, their 
+        estimated size in bytes, and whether the cache has been given up.
+        """
+        return {
+            'hits' : self._hits,
+            'misses' : self._misses,
+            'evictions' : self._evictions,
+            'states' : len( self._cache ),
+            'bytes' : self._bytes,
+            'fallback' : self._fallback
+        }
+
+    def _get_state( self, subset ):
+        state = self._cache.get( subset )
+        if state != None:
+            self._cache.move_to_end( subset )
+            return state
+        if instrumentation.running:
+            instrumentation.count( 'subsets' )
+        state = _lazy_state(
+            subset, not subset.isdisjoint( self._automaton._final_states )
+        )
+        self._cache[ subset ] = state
+        self._bytes += state.size
+        while len( self._cache ) > 1 and (
+            len( self._cache ) > self._max_states or (
+                self._max_bytes != None and self._bytes > self._max_bytes
+            )
+        ):
+            ( key, old ) = self._cache.popitem( last=False )
+            old.alive = False
+            old.transitions = None
+            self._bytes -= old.size
+            self._evictions += 1
+        if (
+            self._evictions >= self._max_states and 
+            self._misses > self._hits
+        ):
+            self._fallback = True
+        return state
+
+    def _next( self, subset, character ):
+        return self._automaton._expand_epsilons(
+            self._automaton._delta( character, subset )
+        )
+
+    def _match_without_cache( self, word ):
+        aut = self._automaton
+        states = aut._expand_epsilons( aut._initial_states )
+        for character in word:
+            if not character in aut._epsilons:
+                states = self._next( states, character )
+        return not states.isdisjoint( aut._final_states )
+
+    def match( self, word ):
+        """
+        Returns True if the word is recognized by the automaton.
+        """
+        if self._fallback:
+            return self._match_without_cache( word )
+        epsilons = self._automaton._epsilons
+        cache = self._cache
+        state = self._initial
+        if state == None or not state.alive:
+            state = self._get_state( 
+                self._automaton._expand_epsilons(
+                    self._automaton._initial_states
+                )
+            )
+            self._initial = state
+        else:
+            cache.move_to_end( state.subset )
+        for character in word:
+            if character in epsilons:
+                continue
+            following = state.transitions.get( character )
+            if following != None and following.alive:
+                self._hits += 1
+                # The current state is always the most recently used one
+                if following is not state:
+                    cache.move_to_end( following.subset )
+            else:
+                self._misses += 1
+                following = self._get_state( 
+                    self._next( state.subset, character )
+                )
+                if state.alive:
+                    state.transitions[ character ] = following
+            state = following
+        return state.final
+
+
+def load_compiled_automaton( path ):
+    """
+    Loads a compiled automaton saved by compiled_automaton.save().
+
+    The file is mapped in memory: the transition table and the final state
+    bitmap are read directly from the mapped buffer, without copy, and so
+    is the matching. The mapping is released by compiled_automaton.close(),
+    or at the end of a with block.
+
+    Example:
+
+    >>> a = automaton(
+    ...     alphabet=[1], epsilons=['0'], initials=[0], finals=[2],
+    ...     transitions=[ (0,'a',1), (1,'b',2), (2,'a',1) ]
+    ... )
+    >>> f=tempfile.NamedTemporaryFile()
+    >>> a.compile().save( f.name )
+    >>> c = load_compiled_automaton( f.name )
+    >>> c.match( 'ab' ) and c.match( 'a0b' ) and not c.match( 'aba' )
+    True
+    >>> c.to_automaton() == a.get_renumbered_automaton()
+    True
+    >>> c.close()
+    >>> with load_compiled_automaton( f.name ) as c:
+    ...     c.match( 'ab' )
+    True
+    >>> f.close()
+    """
+    with open( path, 'rb' ) as f:
+        buffer = mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ )
+    view = memoryview( buffer )
+    try:
+        (
+            magic, version, nb_states, width, initial, nb_characters, size
+        ) = struct.unpack_from( '<4sIIIIII4x', buffer, 0 )
+        if magic != _BINARY_MAGIC or version != _BINARY_VERSION:
+            raise Exception(
+                "In automaton module, " + path + 
+                " is not a compiled automaton file."
+            )
+        offset = 32
+        columns = {}
+        epsilons = []
+        for i in range( nb_characters ):
+            ( column, epsilon, kind, length ) = struct.unpack_from(
+                '<IBBH', buffer, offset
+            )
+            offset += 8
+            character = bytes( view[ offset:offset+length ] ).decode( 'utf-8' )
+            offset += length
+            if kind == 1:
+                character = int( character )
+            columns[ character ] = column
+            if epsilon == 1:
+                epsilons.append( character )
+        if len( buffer ) < 32 + size + 4*nb_states*width + nb_states:
+            raise Exception(
+                "In automaton module, " + path + " is truncated."
+            )
+    except Exception:
+        view.release()
+        buffer.close()
+        raise
+    offset = 32 + size
+    table = view[ offset:offset + 4*nb_states*width ]
+    if sys.byteorder == 'little' and array( 'i' ).itemsize == 4:
+        table = table.cast( 'i' )
+    else:
+        table = array( 'i', struct.unpack( '<' + str( nb_states*width ) + 'i', table ) )
+    offset += 4*nb_states*width
+    finals = view[ offset:offset + nb_states ]
+    result = compiled_automaton(
+        columns, width, table, finals, initial, None, epsilons, True
+    )
+    result._buffer = buffer
+    return result
+
+
 def xml_to_list_of_automata( xml_path ):
     """
     Converts an xml file to a list of automata.
@@ -1330,32 +3450,265 @@ def xml_to_list_of_automata( xml_path ):
     >>> f.flush()
     >>> [automate1, automate2] = xml_to_list_of_automata( f.name )
     >>> f.close()
+    >>> automate2.word_is_recognized( ['a','0','a'] )
+    True
     """
-    tree = ET.parse(xml_path)
-    doc = tree.getroot()
-    result = []
-    for xml_automaton in doc.findall('./automaton'):
-        aut = automaton()
-        for xml_character in xml_automaton.findall('epsilons/c'):
-            aut.add_epsilon_character( str(xml_character.text) )
-        for xml_character in xml_automaton.findall('alphabet/c'):
-            aut.add_character( str(xml_character.text) )
-        for xml_state in xml_automaton.findall('states/s'):
-            aut.add_state( int(xml_state.text) )
-        for xml_state in xml_automaton.findall('initials/s'):
-            aut.add_initial_state( int(xml_state.text) )
-        for xml_state in xml_automaton.findall('finals/s'):
-            aut.add_final_state( int(xml_state.text) )
-        for xml_transition in xml_automaton.findall('transitions/t'):
-            aut.add_transition(
-                (
-                    int(xml_transition.findall('o')[0].text),
-                    str(xml_transition.findall('c')[0].text),
-                    int(xml_transition.findall('e')[0].text)
-                )
+    return list( iter_xml_automata( xml_path ) )
+
+def _xml_to_automaton( xml_automaton ):
+    """
+    This function converts an <automaton> element to an automaton.
+
+    The strings of the states and characters are interned, so that equal
+    labels share the same object, and the transitions are inserted in bulk
+    in the adjacency of the automaton.
+    """
+    states = {}
+    characters = {}
+    def state( text ):
+        if not text in states:
+            states[ text ] = int( text )
+        return states[ text ]
+    def character( text ):
+        if not text in characters:
+            characters[ text ] = str( text )
+        return characters[ text ]
+    aut = automaton()
+    for xml_character in xml_automaton.iterfind('epsilons/c'):
+        aut.add_epsilon_character( character( xml_character.text ) )
+    for xml_character in xml_automaton.iterfind('alphabet/c'):
+        aut.add_character( character( xml_character.text ) )
+    for xml_state in xml_automaton.iterfind('states/s'):
+        aut.add_state( state( xml_state.text ) )
+    for xml_state in xml_automaton.iterfind('initials/s'):
+        aut.add_initial_state( state( xml_state.text ) )
+    for xml_state in xml_automaton.iterfind('finals/s'):
+        aut.add_final_state( state( xml_state.text ) )
+    adjacence = aut._writable( '_adjacence' )
+    for xml_transition in xml_automaton.iterfind('transitions/t'):
+        labels = {}
+        for child in xml_transition:
+            if not child.tag in labels:
+                labels[ child.tag ] = child.text
+        key = ( state( labels['o'] ), character( labels['c'] ) )
+        if not key in adjacence:
+            adjacence[ key ] = set( )
+        adjacence[ key ].add( state( labels['e'] ) )
+    aut.add_states( states.values() )
+    aut.add_characters( characters.values() )
+    return aut
+
+def iter_xml_automata( xml_path ):
+    """
+    Reads an xml file containing a list of automata and yields the 
+    automata one by one.
+
+    The file is read with an incremental parser and each <automaton>
+    element is freed as soon as it has been converted, so the memory used
+    is bounded by the largest automaton of the file. As for
+    xml_to_list_of_automata() and build_xml_index(), only the <automaton>
+    elements that are direct children of the root element are read.
+
+    Keyword arguments:
+    xml_path -- the path of the xml file.
+
+    Example:
+
+    >>> f=tempfile.NamedTemporaryFile()
+    >>> f.write(
+    ...     '''
+    ...     <list_of_automata>
+    ...     <automaton>
+    ...         <initials>   <s>1</s>   </initials>
+    ...         <finals>   <s>2</s>   </finals>
+    ...         <transitions>
+    ...             <t> <o>1</o><c>a</c><e>2</e> </t>
+    ...         </transitions>
+    ...     </automaton>
+    ...     <comment> <automaton> <states> <s>3</s> </states> </automaton> </comment>
+    ...     <automaton>
+    ...         <states> <s>4</s> </states>
+    ...     </automaton>
+    ...     </list_of_automata>
+    ...     '''.encode('utf-8')
+    ... ) != 0
+    True
+    >>> f.flush()
+    >>> automata = iter_xml_automata( f.name )
+    >>> next( automata ).get_transitions() == set( [ (1,'a',2) ] )
+    True
+    >>> next( automata ).get_states() == set( [4] )
+    True
+    >>> next( automata, None ) == None
+    True
+    >>> f.close()
+    """
+    root = None
+    depth = 0
+    for ( event, element ) in ET.iterparse( xml_path, events=('start','end') ):
+        if event == 'start':
+            if root == None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            # A direct child of the root is freed once it has been read
+            if element.tag == 'automaton':
+                aut = _xml_to_automaton( element )
+                element.clear()
+                root.clear()
+                yield aut
+            else:
+                element.clear()
+                root.clear()
+
+
+def build_xml_index( xml_path, index_path=None ):
+    """
+    Records the byte offsets of each <automaton> element of an xml file
+    containing a list of automata, in a sidecar index file. Returns the list
+    of the (start, end) offsets.
+
+    The index file starts with a header line containing the size and the
+    modification time (in nanoseconds) of the xml file, then contains one 
+    line "start end" by automaton.
+
+    Keyword arguments:
+    xml_path -- the path of the xml file.
+    index_path -- the path of the index file [default=xml_path + '.idx']
+
+    Example:
+
+    >>> f=tempfile.NamedTemporaryFile( suffix='.xml' )
+    >>> f.write(
+    ...     b'''<list_of_automata>
+    ...     <!-- <automaton> -->
+    ...     <automaton> <states> <s>1</s> </states> </automaton>
+    ...     <automaton> <states> <s>2</s> </states> </automaton>
+    ...     <automaton/>
+    ...     </list_of_automata>'''
+    ... ) != 0
+    True
+    >>> f.flush()
+    >>> index = build_xml_index( f.name )
+    >>> len( index )
+    3
+    >>> load_xml_index( f.name + '.idx' )[2] == index
+    True
+    >>> xml_automaton_at( f.name, 1 ).get_states() == set( [2] )
+    True
+    >>> xml_automaton_at( f.name, 2 ).get_states() == set( )
+    True
+    >>> os.remove( f.name + '.idx' )
+    >>> f.close()
+    """
+    if index_path == None:
+        index_path = xml_path + '.idx'
+    parser = xml.parsers.expat.ParserCreate()
+    depth = [ 0 ]
+    starts = []
+    ends = []
+    def start_element( name, attributes ):
+        depth[0] += 1
+        if depth[0] == 2 and name == 'automaton':
+            starts.append( parser.CurrentByteIndex )
+    def end_element( name ):
+        if depth[0] == 2 and name == 'automaton':
+            ends.append( parser.CurrentByteIndex )
+        depth[0] -= 1
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    with open( xml_path, 'rb' ) as f:
+        while True:
+            chunk = f.read( 1 << 20 )
+            if len( chunk ) == 0:
+                break
+            parser.Parse( chunk, False )
+        parser.Parse( b'', True )
+        # The end offsets point to the beginning of the closing tags, or
+        # just after the element for an empty element <automaton/>.
+        index = []
+        for ( start, end ) in zip( starts, ends ):
+            f.seek( end )
+            chunk = f.read( 256 )
+            if chunk.startswith( b'</' ):
+                end += chunk.index( b'>' ) + 1
+            index.append( ( start, end ) )
+    status = os.stat( xml_path )
+    with open( index_path, 'w' ) as f:
+        f.write(
+            'automaton-index 2 ' + str( status.st_size ) + ' ' 
+            + str( status.st_mtime_ns ) + '\n'
+        )
+        for ( start, end ) in index:
+            f.write( str( start ) + ' ' + str( end ) + '\n' )
+    return index
+
+def load_xml_index( index_path ):
+    """
+    Returns the triple (size, mtime, index) recorded by build_xml_index():
+    the size and the modification time of the xml file when the index was
+    built, and the list of the (start, end) offsets. The modification time
+    is None for an index written by a previous version of build_xml_index().
+    """
+    with open( index_path ) as f:
+        header = f.readline().split()
+        if not (
+            len( header ) >= 3 and header[0] == 'automaton-index' and
+            ( header[1], len( header ) ) in ( ('1', 3), ('2', 4) )
+        ):
+            raise Exception(
+                "In automaton module, " + index_path + " is not an index file."
             )
-        result.append(aut)
-    return result
+        size = int( header[2] )
+        mtime = None
+        if header[1] == '2':
+            mtime = int( header[3] )
+        index = []
+        for line in f:
+            ( start, end ) = line.split()
+            index.append( ( int( start ), int( end ) ) )
+    return ( size, mtime, index )
+
+def xml_automaton_at( xml_path, position, index_path=None ):
+    """
+    Returns the automaton at ``position`` (starting from 0) in an xml file
+    containing a list of automata, parsing only that automaton.
+
+    The offsets are read from the index file, which is built by 
+    build_xml_index() if it is missing, if the size or the modification 
+    time of the xml file has changed, or if the indexed offset does not 
+    point to an <automaton> element. The xml file has to be encoded in 
+    UTF-8.
+
+    Keyword arguments:
+    xml_path -- the path of the xml file.
+    position -- the position of the automaton in the file.
+    index_path -- the path of the index file [default=xml_path + '.idx']
+    """
+    if index_path == None:
+        index_path = xml_path + '.idx'
+    index = None
+    if os.path.exists( index_path ):
+        ( size, mtime, index ) = load_xml_index( index_path )
+        status = os.stat( xml_path )
+        if size != status.st_size or mtime != status.st_mtime_ns:
+            index = None
+    data = None
+    if index != None and -len( index ) <= position < len( index ):
+        data = _read_xml_entry( xml_path, index[ position ] )
+    if data == None or not data.startswith( b'<automaton' ):
+        index = build_xml_index( xml_path, index_path )
+        data = _read_xml_entry( xml_path, index[ position ] )
+    return _xml_to_automaton( ET.fromstring( data ) )
+
+def _read_xml_entry( xml_path, entry ):
+    # Returns the bytes between the (start, end) offsets of ``entry``.
+    ( start, end ) = entry
+    with open( xml_path, 'rb' ) as f:
+        f.seek( start )
+        return f.read( end - start )
 
 
 #if __name__ == "__main__":
@@ -0,0 +1,292 @@
+"""
+Banc d'essai des algorithmes principaux de startautomaton.
+
+Chaque opération est mesurée sur des automates aléatoires (générés à partir d'une graine) dont
+la taille double à chaque étape. Les résultats sont écrits au format JSON pour comparer deux
+exécutions et repérer les régressions de complexité : pour chaque taille, "exposant" est le
+logarithme en base 2 du rapport entre le temps mesuré et celui de la taille précédente
+(1 pour un algorithme linéaire, 2 pour un algorithme quadratique...).
+
+Utilisation :
+	python benchmark.py --taille-min 4 --taille-max 64 --sortie resultats.json
+"""
+
+from startautomaton import *
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import signal
+import sys
+import tempfile
+import time
+
+
+# Générateurs aléatoires
+
+def alphabet_aleatoire(taille_alphabet):
+	"""
+	Renvoie un alphabet de "taille_alphabet" lettres : 'a', 'b', ... puis 'l26', 'l27', ...
+	"""
+	return [chr(ord('a') + i) if i < 26 else "l" + str(i) for i in range(taille_alphabet)]
+
+def automate_aleatoire(nb_etats, densite=1.5, taille_alphabet=2, proportion_epsilon=0.1,
+		deterministe=False, graine=0):
+	"""
+	Renvoie un startautomaton aléatoire dont les états sont les entiers de 0 à nb_etats - 1,
+	l'état initial est 0 et environ un état sur cinq est final.
+
+	Non déterministe : l'automate a densite * nb_etats * taille_alphabet transitions, dont une
+	proportion "proportion_epsilon" d'epsilon transitions (caractère '0').
+	Déterministe : chaque couple (état, lettre) a une transition avec la probabilité
+	min(densite, 1), et il n'y a pas d'epsilon transition.
+	"""
+	generateur = random.Random(graine)
+	alphabet = alphabet_aleatoire(taille_alphabet)
+	epsilons = ['0'] if proportion_epsilon > 0 and not deterministe else []
+	transitions = []
+	if deterministe:
+		for origine in range(nb_etats):
+			for lettre in alphabet:
+				if generateur.random() < densite:
+					transitions.append((origine, lettre, generateur.randrange(nb_etats)))
+	else:
+		for i in range(int(round(densite * nb_etats * taille_alphabet))):
+			if generateur.random() < proportion_epsilon:
+				lettre = '0'
+			else:
+				lettre = generateur.choice(alphabet)
+			transitions.append((generateur.randrange(nb_etats), lettre, generateur.randrange(nb_etats)))
+	finaux = [e for e in range(nb_etats) if generateur.random() < 0.2]
+	if len(finaux) == 0:
+		finaux = [generateur.randrange(nb_etats)]
+	return startautomaton(alphabet, epsilons, range(nb_etats), [0], finaux, transitions)
+
+def expression_aleatoire(nb_lettres, taille_alphabet=2, graine=0):
+	"""
+	Renvoie une expression préfixée aléatoire (voir startautomaton.express_to_auto) contenant
+	"nb_lettres" lettres. L'expression est équilibrée : sa profondeur est logarithmique.
+	"""
+	generateur = random.Random(graine)
+	alphabet = alphabet_aleatoire(taille_alphabet)
+	def construire(nb):
+		if nb == 1:
+			expression = generateur.choice(alphabet)
+		else:
+			gauche = generateur.randint(1, nb - 1)
+			if generateur.random() < 0.5:
+				expression = [".", construire(gauche), construire(nb - gauche)]
+			else:
+				expression = ["+", [construire(gauche), construire(nb - gauche)]]
+		if generateur.random() < 0.2:
+			expression = ["*", expression]
+		return expression
+	return construire(nb_lettres)
+
+def mot_aleatoire(longueur, taille_alphabet=2, graine=0):
+	"""
+	Renvoie une liste aléatoire de "longueur" lettres
+	"""
+	generateur = random.Random(graine)
+	alphabet = alphabet_aleatoire(taille_alphabet)
+	return [generateur.choice(alphabet) for i in range(longueur)]
+
+def ecrire_xml(automates, chemin):
+	"""
+	Écrit une liste d'automates dans un fichier xml lisible par xml_to_list_of_automata
+	"""
+	with open(chemin, "w") as f:
+		f.write("<list_of_automata>\n")
+		for aut in automates:
+			f.write("<automaton>\n")
+			for balise, elements, sous_balise in (("epsilons", aut.get_epsilons(), "c"),
+					("alphabet", aut.get_alphabet(), "c"), ("states", aut.get_states(), "s"),
+					("initials", aut.get_initial_states(), "s"), ("finals", aut.get_final_states(), "s")):
+				f.write("<" + balise + ">")
+				for e in elements:
+					f.write("<" + sous_balise + ">" + str(e) + "</" + sous_balise + ">")
+				f.write("</" + balise + ">\n")
+			f.write("<transitions>\n")
+			for (origine, lettre, fin) in aut.transitions_view():
+				f.write("<t><o>" + str(origine) + "</o><c>" + str(lettre) + "</c><e>" + str(fin) + "</e></t>\n")
+			f.write("</transitions>\n</automaton>\n")
+		f.write("</list_of_automata>\n")
+
+
+# Mesures
+
+class DelaiDepasse(Exception):
+	"""
+	Levée quand une mesure dure plus longtemps que le délai maximal
+	"""
+
+def _interrompre(signal_recu, pile):
+	raise DelaiDepasse()
+
+def mesurer(fonction, repetitions, delai_max=None):
+	"""
+	Renvoie le meilleur temps (en secondes) de "repetitions" appels à "fonction". Si "delai_max"
+	n'est pas None, un appel est interrompu au bout de "delai_max" secondes et DelaiDepasse est
+	levée (sur les systèmes qui ont SIGALRM ; ailleurs le délai est ignoré).
+	"""
+	alarme = delai_max is not None and hasattr(signal, "SIGALRM")
+	if alarme:
+		ancien = signal.signal(signal.SIGALRM, _interrompre)
+	try:
+		meilleur = None
+		for i in range(repetitions):
+			if alarme:
+				signal.setitimer(signal.ITIMER_REAL, delai_max)
+			debut = time.perf_counter()
+			try:
+				fonction()
+			finally:
+				if alarme:
+					signal.setitimer(signal.ITIMER_REAL, 0)
+			duree = time.perf_counter() - debut
+			if meilleur is None or duree < meilleur:
+				meilleur = duree
+		return meilleur
+	finally:
+		if alarme:
+			signal.signal(signal.SIGALRM, ancien)
+
+def preparer(operation, taille, options, graine):
+	"""
+	Construit les données de l'opération pour une taille (hors mesure) et renvoie la fonction à
+	mesurer, ainsi qu'une fonction de nettoyage (ou None)
+	"""
+	nfa = lambda g: automate_aleatoire(taille, options.densite, options.alphabet, options.epsilons, False, g)
+	dfa = lambda g: automate_aleatoire(taille, options.densite, options.alphabet, 0, True, g)
+	if operation == "delta_star":
+		a, mot = nfa(graine), mot_aleatoire(options.longueur_mot, options.alphabet, graine)
+		return (lambda: a.delta_star(mot)), None
+	if operation == "word_is_recognized":
+		a, mot = nfa(graine), mot_aleatoire(options.longueur_mot, options.alphabet, graine)
+		return (lambda: a.word_is_recognized(mot)), None
+	if operation == "determinisation":
+		a = nfa(graine)
+		return (lambda: a.determinisation()), None
+	if operation == "minimiser":
+		a = dfa(graine)
+		return (lambda: a.minimiser()), None
+	if operation == "minimiser_hopcroft":
+		a = dfa(graine)
+		return (lambda: a.minimiser(False, "hopcroft")), None
+	if operation == "union":
+		a, b = dfa(graine), dfa(graine + 1)
+		return (lambda: a.union(b)), None
+	if operation == "intersection":
+		a, b = dfa(graine), dfa(graine + 1)
+		return (lambda: a.intersection(b)), None
+	if operation == "complement":
+		a = dfa(graine)
+		return (lambda: a.complement()), None
+	if operation == "express_to_auto":
+		expression = expression_aleatoire(taille, options.alphabet, graine)
+		# La construction classique affiche encore des traces (print) : elles sont écartées pour
+		# ne pas inonder la sortie ni mesurer les écritures sur la console
+		def construire():
+			with contextlib.redirect_stdout(io.StringIO()):
+				return startautomaton.express_to_auto(expression)
+		return construire, None
+	if operation == "express_to_auto_thompson":
+		expression = expression_aleatoire(taille, options.alphabet, graine)
+		return (lambda: startautomaton.express_to_auto(expression, "thompson")), None
+	if operation == "xml_to_list_of_automata":
+		descripteur, chemin = tempfile.mkstemp(suffix = ".xml")
+		os.close(descripteur)
+		ecrire_xml([nfa(graine + i) for i in range(options.nb_automates_xml)], chemin)
+		return (lambda: xml_to_list_of_automata(chemin)), (lambda: os.remove(chemin))
+	if operation == "to_dot":
+		a = nfa(graine)
+		return (lambda: a.to_dot()), None
+	raise Exception("Operation inconnue : " + str(operation))
+
+OPERATIONS = ["delta_star", "word_is_recognized", "determinisation", "minimiser", "minimiser_hopcroft", "union",
+	"intersection", "complement", "express_to_auto", "express_to_auto_thompson", "xml_to_list_of_automata", "to_dot"]
+
+def banc_d_essai(options):
+	"""
+	Mesure chaque opération sur des tailles doublant de options.taille_min à options.taille_max.
+	Une opération n'est plus mesurée aux tailles suivantes dès qu'une mesure dépasse
+	options.limite secondes, ou qu'elle est interrompue au bout de options.delai_max secondes
+	(la mesure est alors notée avec "secondes" à null et "interrompue" à true).
+	Renvoie un dictionnaire prêt à être écrit en JSON.
+	"""
+	resultats = {}
+	for operation in options.operations:
+		mesures = []
+		taille = options.taille_min
+		while taille <= options.taille_max:
+			fonction, nettoyage = preparer(operation, taille, options, options.graine)
+			try:
+				secondes = mesurer(fonction, options.repetitions, options.delai_max)
+			except DelaiDepasse:
+				secondes = None
+			finally:
+				if nettoyage is not None:
+					nettoyage()
+			if secondes is None:
+				mesures.append({"taille": taille, "secondes": None, "exposant": None, "interrompue": True})
+				print("%-24s %8d   interrompue" % (operation, taille))
+				break
+			mesure = {"taille": taille, "secondes": secondes, "exposant": None, "interrompue": False}
+			if len(mesures) > 0 and mesures[-1]["secondes"] > 0 and secondes > 0:
+				mesure["exposant"] = math.log(secondes / mesures[-1]["secondes"], 2)
+			mesures.append(mesure)
+			print("%-24s %8d %12.6f s" % (operation, taille, secondes))
+			sys.stdout.flush()
+			if secondes > options.limite:
+				break
+			taille *= 2
+		resultats[operation] = mesures
+	parametres = dict(vars(options))
+	del parametres["sortie"]
+	return {
+		"parametres": parametres,
+		"machine": {
+			"python": platform.python_version(),
+			"implementation": platform.python_implementation(),
+			"systeme": platform.platform()
+		},
+		"resultats": resultats
+	}
+
+def lire_options(arguments=None):
+	"""
+	Lit les options de la ligne de commande
+	"""
+	analyseur = argparse.ArgumentParser(description = "Banc d'essai des algorithmes de startautomaton")
+	analyseur.add_argument("--taille-min", type = int, default = 4, help = "plus petit nombre d'états")
+	analyseur.add_argument("--taille-max", type = int, default = 64, help = "plus grand nombre d'états")
+	analyseur.add_argument("--densite", type = float, default = 1.5,
+		help = "nombre moyen de transitions par état et par lettre")
+	analyseur.add_argument("--alphabet", type = int, default = 2, help = "taille de l'alphabet")
+	analyseur.add_argument("--epsilons", type = float, default = 0.1,
+		help = "proportion d'epsilon transitions des automates non déterministes")
+	analyseur.add_argument("--longueur-mot", type = int, default = 1000,
+		help = "longueur des mots lus par delta_star et word_is_recognized")
+	analyseur.add_argument("--nb-automates-xml", type = int, default = 10,
+		help = "nombre d'automates du fichier lu par xml_to_list_of_automata")
+	analyseur.add_argument("--repetitions", type = int, default = 3, help = "le meilleur temps est gardé")
+	analyseur.add_argument("--limite", type = float, default = 10.0,
+		help = "au-delà de cette durée (en secondes), l'opération n'est plus mesurée aux tailles suivantes")
+	analyseur.add_argument("--delai-max", type = float, default = 60.0,
+		help = "une mesure plus longue (en secondes) est interrompue")
+	analyseur.add_argument("--graine", type = int, default = 0, help = "graine des générateurs aléatoires")
+	analyseur.add_argument("--operations", nargs = "+", choices = OPERATIONS, default = OPERATIONS)
+	analyseur.add_argument("--sortie", default = "benchmark.json", help = "fichier JSON des résultats")
+	return analyseur.parse_args(arguments)
+
+
+if __name__ == "__main__":
+	options = lire_options()
+	resultats = banc_d_essai(options)
+	with open(options.sortie, "w") as f:
+		json.dump(resultats, f, indent = 2)
+	print("Résultats écrits dans " + options.sortie)
@@ -1,5 +1,11 @@
 from automaton import *
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+import functools
+import inspect
+import os
+import sys
 	
 
 def get_origine_trans(transition):
@@ -38,6 +44,188 @@ def renverser_tuple(transition):
 	return (fin, lettre, origin)
 
 
+# Cache des opérations
+
+class cache_operations:
+	"""
+	Cache LRU des résultats des opérations coûteuses (determinisation, minimiser, complement,
+	express_to_auto). Une entrée est associée au nom de l'opération, à ses paramètres et au
+	contenu de l'automate d'entrée (voir _empreinte) : deux automates égaux partagent leurs entrées.
+	Le cache est borné par un nombre d'entrées et, si "max_octets" n'est pas None, par une taille
+	estimée en octets : les entrées les moins récemment utilisées sont supprimées en premier.
+
+	Le cache garde sa propre copie de chaque résultat et renvoie une copie à chaque succès :
+	l'appelant peut modifier l'automate obtenu sans corrompre le cache. Les copies se font
+	en temps constant (voir automaton.clone).
+	"""
+
+	def __init__(self, max_entrees=128, max_octets=None):
+		self._max_entrees = max_entrees
+		self._max_octets = max_octets
+		self.vider()
+
+	def vider(self):
+		"""
+		Vide le cache et remet à zéro les statistiques
+		"""
+		self._entrees = OrderedDict()
+		self._octets = 0
+		self._succes = 0
+		self._echecs = 0
+		self._suppressions = 0
+
+	def statistiques(self):
+		"""
+		Renvoie un dictionnaire contenant le nombre de succès (hits), d'échecs (misses) et de
+		suppressions (evictions), le nombre d'entrées et leur taille estimée en octets.
+		"""
+		return {
+			'hits' : self._succes,
+			'misses' : self._echecs,
+			'evictions' : self._suppressions,
+			'entries' : len(self._entrees),
+			'bytes' : self._octets
+		}
+
+	def chercher(self, cle):
+		"""
+		Renvoie une copie du résultat associé à la clé, ou None s'il n'est pas dans le cache
+		"""
+		entree = self._entrees.get(cle)
+		if entree is None:
+			self._echecs += 1
+			return None
+		self._succes += 1
+		self._entrees.move_to_end(cle)
+		return entree[0].clone()
+
+	def ajouter(self, cle, automate):
+		"""
+		Associe à la clé une copie de l'automate, puis supprime les entrées les moins récemment
+		utilisées tant que le cache dépasse ses bornes
+		"""
+		if cle in self._entrees:
+			self._octets -= self._entrees.pop(cle)[1]
+		taille = _taille_estimee(cle) + _taille_estimee(automate)
+		self._entrees[cle] = (automate.clone(), taille)
+		self._octets += taille
+		while len(self._entrees) > 0 and (len(self._entrees) > self._max_entrees or
+				(self._max_octets is not None and self._octets > self._max_octets)):
+			ancienne, (resultat, taille) = self._entrees.popitem(last = False)
+			self._octets -= taille
+			self._suppressions += 1
+
+_cache = None
+
+def activer_cache(max_entrees=128, max_octets=None):
+	"""
+	Active le cache des opérations (il est désactivé par défaut) et le renvoie
+	"""
+	global _cache
+	_cache = cache_operations(max_entrees, max_octets)
+	return _cache
+
+def desactiver_cache():
+	"""
+	Désactive le cache des opérations
+	"""
+	global _cache
+	_cache = None
+
+def cache_actif():
+	"""
+	Renvoie le cache des opérations, ou None s'il est désactivé
+	"""
+	return _cache
+
+def _empreinte(aut):
+	"""
+	Renvoie l'empreinte d'un automate : ses ensembles de lettres, d'epsilons, d'états, d'états
+	initiaux, d'états finaux et de transitions, figés. Deux automates égaux construits séparément
+	ont la même empreinte. Une empreinte à isomorphisme près (automaton.fingerprint) ne suffirait
+	pas : les résultats des opérations dépendent des noms des états. L'empreinte est mémorisée
+	dans le jeton de version de l'automate (voir automaton._get_version) : elle n'est recalculée
+	qu'après une modification, et elle est partagée par les clones non modifiés.
+	"""
+	version = aut._get_version()
+	if version.key is None:
+		transitions = frozenset((origine, lettre, fin) for (origine, lettre), fins in aut._adjacence.items() for fin in fins)
+		version.key = (frozenset(aut._alphabet), frozenset(aut._epsilons), frozenset(aut._states),
+			frozenset(aut._initial_states), frozenset(aut._final_states), transitions)
+	return version.key
+
+# Encadrent les sous-listes d'un paramètre mis à plat par _figer
+_DEBUT_LISTE = object()
+_FIN_LISTE = object()
+
+def _figer(obj):
+	"""
+	Rend hashable un paramètre d'opération. Une expression est une liste de listes, parfois très
+	profonde : elle est mise à plat dans un seul tuple, chaque sous-liste étant encadrée par
+	_DEBUT_LISTE et _FIN_LISTE, pour que ni la construction de la clé ni sa comparaison ne soient
+	récursives.
+	"""
+	if not isinstance(obj, (list, tuple)):
+		return _empreinte(obj) if isinstance(obj, automaton) else obj
+	resultat = [_DEBUT_LISTE]
+	pile = [iter(obj)]
+	while pile:
+		for e in pile[-1]:
+			if isinstance(e, (list, tuple)):
+				resultat.append(_DEBUT_LISTE)
+				pile.append(iter(e))
+				break
+			resultat.append(_empreinte(e) if isinstance(e, automaton) else e)
+		else:
+			pile.pop()
+			resultat.append(_FIN_LISTE)
+	return tuple(resultat)
+
+def _taille_estimee(obj):
+	"""
+	Estime la taille en octets d'une clé ou d'un automate du cache, sans compter les objets
+	représentant les états et les lettres, qui sont partagés
+	"""
+	taille = 0
+	pile = [obj]
+	while pile:
+		obj = pile.pop()
+		if isinstance(obj, automaton):
+			taille += sys.getsizeof(obj._adjacence)
+			for fins in obj._adjacence.values():
+				taille += sys.getsizeof(fins)
+			for ensemble in (obj._alphabet, obj._epsilons, obj._states, obj._initial_states, obj._final_states):
+				taille += sys.getsizeof(ensemble)
+		elif isinstance(obj, (tuple, frozenset)):
+			taille += sys.getsizeof(obj)
+			pile.extend(obj)
+	return taille
+
+def _mis_en_cache(operation):
+	"""
+	Décorateur des opérations mises en cache. Quand le cache est activé, un appel non destructif
+	cherche d'abord son résultat dans le cache, et l'y ajoute sinon.
+	"""
+	def decorateur(fonction):
+		signature = inspect.signature(fonction)
+		@functools.wraps(fonction)
+		def enveloppe(*args, **kwargs):
+			if _cache is None:
+				return fonction(*args, **kwargs)
+			arguments = signature.bind(*args, **kwargs)
+			arguments.apply_defaults()
+			if arguments.arguments.get("destructif", False):
+				return fonction(*args, **kwargs)
+			cle = (operation,) + tuple((nom, _figer(valeur)) for nom, valeur in arguments.arguments.items())
+			resultat = _cache.chercher(cle)
+			if resultat is None:
+				resultat = fonction(*args, **kwargs)
+				_cache.ajouter(cle, resultat)
+			return resultat
+		return enveloppe
+	return decorateur
+
+
 class startautomaton(automaton):
 	"""
 	Cette classe hérite de la classe automaton définie dans la bibliothèque automaton.py. Elle ajoute plusieurs fonctionnalités
@@ -45,18 +233,67 @@ class startautomaton(automaton):
 	de toutes les fonctionnalités développées dans la bibliothèque
 	"""
 
+	# Les dictionnaires des compteurs sont partagés par clone() comme les autres conteneurs
+	_shared_attributes = automaton._shared_attributes + ('_nb_transitions_lettre', '_nb_etats_couverts')
+
 # Constructeur
 
 	def __init__(self, alphabet=None, epsilons=None, states=None, initials=None, finals=None, 
 		transitions=None, deterministe=False, complet=False):
 		"""
-		Construit l'automate et permet de définir deux champs _est_complet et _est_deterministe.
-		Ces deux attributs permettent de savoir à tout moment si l'automate est complet ou déterministe. Il sont mis à jour par
-		les méthodes modifiant l'automate
+		Construit l'automate et initialise les compteurs qui permettent de savoir à tout moment si
+		l'automate est complet ou déterministe. Ils sont mis à jour par les méthodes modifiant
+		l'automate. Les paramètres "deterministe" et "complet" sont conservés par compatibilité :
+		ces deux propriétés sont maintenant calculées.
 		"""
+		self._initialiser_compteurs()
 		automaton.__init__(self, alphabet, epsilons, states, initials, finals, transitions)
-		self._est_complet = complet
-		self._est_deterministe = deterministe
+
+	def _initialiser_compteurs(self):
+		"""
+		Remet à zéro les compteurs utilisés par est_deterministe et est_complet :
+		- _nb_transitions_lettre : nombre de transitions étiquetées par chaque lettre ;
+		- _nb_etats_couverts : nombre d'états ayant au moins une transition par chaque lettre ;
+		- _nb_couverts : somme de _nb_etats_couverts sur les lettres qui ne sont pas des epsilons ;
+		- _nb_multiples : nombre de couples (état, lettre) ayant au moins deux transitions ;
+		- _nb_transitions_epsilon : nombre d'epsilon transitions.
+		"""
+		self._nb_transitions_lettre = {}
+		self._nb_etats_couverts = {}
+		self._release('_nb_transitions_lettre', '_nb_etats_couverts')
+		self._nb_couverts = 0
+		self._nb_multiples = 0
+		self._nb_transitions_epsilon = 0
+
+	def _recalculer_compteurs(self):
+		"""
+		Recalcule tous les compteurs à partir des transitions de l'automate
+		"""
+		self._initialiser_compteurs()
+		for (e, l) in self._adjacence:
+			self._compter(l, 0, len(self._adjacence[(e, l)]))
+
+	def _compter(self, lettre, avant, apres):
+		"""
+		Met à jour les compteurs lorsque le nombre de transitions d'un couple (état, lettre)
+		passe de "avant" à "apres"
+		"""
+		self._writable('_nb_transitions_lettre')[lettre] = self._nb_transitions_lettre.get(lettre, 0) + apres - avant
+		epsilon = lettre in self._epsilons
+		if epsilon:
+			self._nb_transitions_epsilon += apres - avant
+		if avant == 0 and apres > 0:
+			self._writable('_nb_etats_couverts')[lettre] = self._nb_etats_couverts.get(lettre, 0) + 1
+			if not epsilon:
+				self._nb_couverts += 1
+		elif avant > 0 and apres == 0:
+			self._writable('_nb_etats_couverts')[lettre] -= 1
+			if not epsilon:
+				self._nb_couverts -= 1
+		if avant < 2 <= apres:
+			self._nb_multiples += 1
+		elif apres < 2 <= avant:
+			self._nb_multiples -= 1
 
 	def reconstruction(self, aut2):
 		"""
@@ -64,8 +301,7 @@ class startautomaton(automaton):
 		"""
 		self.__init__(aut2.get_alphabet(), aut2.get_epsilons(),
 				aut2.get_states(), aut2.get_initial_states(),
-				aut2.get_final_states(), aut2.get_transitions(),
-				aut2._est_deterministe, aut2._est_complet)
+				aut2.get_final_states(), aut2.get_transitions())
 
 	def auto_to_startauto(self, aut):
 		"""
@@ -73,9 +309,7 @@ class startautomaton(automaton):
 		"""
 		self.__init__(aut.get_alphabet(), aut.get_epsilons(),
 			aut.get_states(), aut.get_initial_states(),
-			aut.get_final_states(), aut.get_transitions(), False, False)
-		self.est_deterministe()
-		self.est_complet()
+			aut.get_final_states(), aut.get_transitions())
 
 
 # Fonctions utilitaires
@@ -127,8 +361,8 @@ class startautomaton(automaton):
 		Retourne la liste des epsilon transitions de l'automate
 		"""
 		liste = []
-		for e in self.get_states():								# Pour tous les etats
-			for eps in self.get_epsilons():						# Pour tous les caracteres representant epsilon
+		for e in self.states_view():							# Pour tous les etats
+			for eps in self.epsilons_view():					# Pour tous les caracteres representant epsilon
 				if (e, eps) in self._adjacence:					# Il nous faut une transition
 					for dest in self._adjacence[(e, eps)]:
 						liste.append((e, eps, dest))
@@ -137,47 +371,57 @@ class startautomaton(automaton):
 
 	def est_deterministe(self):
 		"""
-		Renvoie Vrai si l'automate est déterministe et Faux sinon. Met à jour l'attribut _est_deterministe		
+		Renvoie Vrai si l'automate est déterministe et Faux sinon : au plus un état initial,
+		aucune epsilon transition et au plus une transition par état et par lettre.
+		Le test se fait en temps constant grâce aux compteurs.
 		"""
-		res = True
-		for e in self.get_states():				
-			for l in self.get_alphabet():				
-				if len(self._delta(l, [e])) > 1:
-					res = False
-					break
-			if not res:
-				break
-
-		self._est_deterministe = res
-
-		return res
+		return (self._nb_multiples == 0 and self._nb_transitions_epsilon == 0
+				and len(self._initial_states) <= 1)
 
 	def est_complet(self):
 		"""
-		Renvoie Vrai si l'automate est complet et Faux sinon. Met à jour l'attribut _est_complet
+		Renvoie Vrai si l'automate est complet et Faux sinon : chaque état a au moins une transition
+		par chaque lettre qui n'est pas un epsilon. Le test se fait en temps constant grâce aux compteurs.
 		"""	
-		res = True
-		for e in self.get_states():
-			for l in self.get_alphabet():				
-				if self._delta(l, [e]) == pretty_set():
-					res = False
-					break
-			if not res:
-				break
+		return self._nb_couverts == len(self._states) * (len(self._alphabet) - len(self._epsilons))
 
-		self._est_complet = res
+	def add_transition(self, transition):
+		"""
+		Ajoute une transition et met à jour les compteurs
+		"""
+		q1, lettre, q2 = transition
+		avant = len(self._adjacence.get((q1, lettre), ()))
+		automaton.add_transition(self, transition)
+		apres = len(self._adjacence[(q1, lettre)])
+		if apres != avant:
+			self._compter(lettre, avant, apres)
+
+	def add_epsilon_character(self, character):
+		"""
+		Définit un caractère epsilon et met à jour les compteurs
+		"""
+		deja_epsilon = character in self._epsilons
+		automaton.add_epsilon_character(self, character)
+		if not deja_epsilon:
+			self._nb_couverts -= self._nb_etats_couverts.get(character, 0)
+			self._nb_transitions_epsilon += self._nb_transitions_lettre.get(character, 0)
+
+	def map(self, f):
+		"""
+		Remplace chaque état s par f(s) et recalcule les compteurs
+		"""
+		automaton.map(self, f)
+		self._recalculer_compteurs()
 
-		return res
-	
 	def remove_epsilon_transitions(self):
 		"""
 		Supprime les epsilon transitions de l'automate. Les transitions adéquates sont ajoutées pour conserver le même langage
 		"""
-		for origin in self.get_states():
-			for l in self.get_alphabet():
+		for origin in self.states_view():
+			for l in self.alphabet_view():
 				for e in self.delta(l, [origin]):
 					self.add_transition((origin, l, e))
-		for e in self.get_states():
+		for e in self.states_view():
 			for removable in self.get_epsilon_transitions():
 				self.remove_transition(removable)
 	
@@ -186,30 +430,35 @@ class startautomaton(automaton):
 		Supprime les états initiaux
 		"""
 		self._initial_states = set()
+		self._release('_initial_states')
 
 	def remove_final_states(self):
 		"""
 		Supprime les états finaux
 		"""
 		self._final_states = set()
+		self._release('_final_states')
 
 	def remove_transitions(self):
 		"""
 		Supprime l'ensemble des transitions d'un automate
 		"""
-		self._adjacence.clear()
+		self._adjacence = {}
+		self._release('_adjacence')
+		self._closures = None
+		self._initialiser_compteurs()
 
 	def remove_initial_state(self, state):
 		"""
 		Supprime de l'automate l'état initial passé en paramètre
 		"""
-		self._initial_states.remove(state)
+		self._writable('_initial_states').remove(state)
 
 	def remove_final_state(self, state):
 		"""
 		Supprime de l'automate l'état final passé en paramètre
 		"""
-		self._final_states.remove(state)
+		self._writable('_final_states').remove(state)
 
 	def remove_transition(self, transition):
 		"""
@@ -218,12 +467,20 @@ class startautomaton(automaton):
 		q1,lettre,q2 = transition
 		if (q1, lettre) in self._adjacence:
 			if q2 in self._adjacence[(q1, lettre)]:
-				self._adjacence[(q1, lettre)].remove(q2)
+				destinations = self._writable_bucket((q1, lettre))
+				destinations.remove(q2)
+				apres = len(destinations)
+				self._compter(lettre, apres + 1, apres)
+				if lettre in self._epsilons:
+					self._closures = None
 
 	def remove_epsilons(self):
 		"""
 		Supprime les caractères encodant les epsilon transitions.
 		"""
+		for eps in self._epsilons:
+			self._nb_couverts += self._nb_etats_couverts.get(eps, 0)
+		self._nb_transitions_epsilon = 0
 		super(startautomaton, self).remove_epsilon_transitions()
 
 # Fonctions pour gérer les différentes actions sur l'automate
@@ -232,20 +489,24 @@ class startautomaton(automaton):
 		"""
 		Renvoie l'automate complete. Le paramètre "destructif" rend destructive la méthode.
 		Par défaut, la méthode ne modifie pas l'automate
+
+		Les lettres d'une même classe (voir get_character_classes) ont les mêmes transitions
+		depuis chaque état : on ne teste qu'une lettre par classe.
 		"""
 		automate_tmp = self.clone()
+		if self.est_complet():
+			return automate_tmp
 
 		# Ajout de l etat puit
-		etat_puit = pretty_set([self.get_maximal_id() + 1])
+		etat_puit = pretty_set([self.get_new_id()])
 		automate_tmp.add_state(etat_puit)
 
-		for e in self.get_states() :
-			for a in self.get_alphabet() :
-				if not a in self.get_epsilons() and self._delta(a, [e]) == pretty_set():
-					automate_tmp.add_transition( (e, a, etat_puit) )
-
-		self._est_complet = True
-		self.est_deterministe()
+		classes = self.get_character_classes()
+		for e in automate_tmp.states_view() :
+			for classe in classes :
+				if len(automate_tmp._adjacence.get((e, next(iter(classe))), ())) == 0:
+					for a in classe :
+						automate_tmp.add_transition( (e, a, etat_puit) )
 
 		if destructif:
 			self.reconstruction(automate_tmp)
@@ -253,26 +514,324 @@ class startautomaton(automaton):
 
 		return automate_tmp
 
-	def minimiser(self, destructif=False):
+	@_mis_en_cache("minimiser")
+	def minimiser(self, destructif=False, methode="brzozowski"):
 		"""
 		Renvoie l'automate minimal. Le paramètre "destructif" rend destructive la méthode.
 		Par défaut, la méthode ne modifie pas l'automate
+
+		Le paramètre "methode" choisit l'algorithme :
+		- "brzozowski" (par défaut) : miroir et déterminisation, deux fois. Le résultat est complet ;
+		- "hopcroft" : raffinement de partition en O(n.|A|.log n). L'automate n'est déterminisé que
+		  s'il n'est pas déterministe, et n'a pas besoin d'être complet. Le résultat est l'automate
+		  minimal émondé (sans état puits), dont les états sont numérotés de 1 à n.
+
+		Quand l'instrumentation est active, la durée de chaque phase est mesurée
+		("minimiser.miroir_1", "minimiser.determinisation_1", ... ou "minimiser.determinisation"
+		et "minimiser.hopcroft").
+
+		Exemple
+		>>> a = startautomaton(['a', 'b'], ['0'], [], [0], [3],
+		...		[(0, 'a', 1), (0, 'b', 0), (1, '0', 2), (2, 'b', 3), (3, 'a', 3), (1, 'b', 3)])
+		>>> equivalent(a.minimiser(), a.minimiser(False, "hopcroft"))
+		(True, None)
+		>>> a.minimiser(methode="hopcroff")
+		Traceback (most recent call last):
+		...
+		Exception: Methode inconnue : hopcroff
 		"""
+		if not methode in ("brzozowski", "hopcroft"):
+			raise Exception("Methode inconnue : " + str(methode))
+		if methode == "hopcroft":
+			automate_tmp = self
+			if self._a_determiniser():
+				with instrumentation.phase("minimiser.determinisation"):
+					automate_tmp = self.determinisation(False, "bitset")
+			with instrumentation.phase("minimiser.hopcroft"):
+				automate_tmp = automate_tmp._hopcroft()
+			if destructif:
+				self.reconstruction(automate_tmp)
+			return automate_tmp
 
 		if destructif:
 			automate_tmp = self
 		else:
 			automate_tmp = self.clone()
-		automate_tmp.miroir(True)
-		automate_tmp.determinisation(True)
-		automate_tmp.miroir(True)
-		return automate_tmp.determinisation(True)
+		with instrumentation.phase("minimiser.miroir_1"):
+			automate_tmp.miroir(True)
+		with instrumentation.phase("minimiser.determinisation_1"):
+			automate_tmp.determinisation(True)
+		with instrumentation.phase("minimiser.miroir_2"):
+			automate_tmp.miroir(True)
+		with instrumentation.phase("minimiser.determinisation_2"):
+			return automate_tmp.determinisation(True)
+
+	def _hopcroft(self):
+		"""
+		Renvoie l'automate minimal d'un automate déterministe (sans epsilon transition),
+		calculé par l'algorithme de Hopcroft. L'automate peut être partiel : un état puits virtuel
+		le complète pendant le calcul, puis sa classe est supprimée du résultat. La classe du
+		puits n'est jamais utilisée comme séparateur, si bien que les transitions vers le puits ne
+		sont jamais parcourues (Béal et Crochemore, Minimizing incomplete automata, 2008).
+		Le raffinement ne considère qu'une lettre par classe de lettres (voir get_character_classes),
+		et seulement les transitions existantes : le coût dépend du nombre de transitions et non de
+		la taille de l'alphabet.
+
+		Exemple
+		>>> a = startautomaton(['a'], [], [], [1], [2, 3], [(1, 'a', 2), (2, 'a', 3), (3, 'a', 2)])
+		>>> m = a._hopcroft()
+		>>> len(m.get_states()), equivalent(a, m)
+		(2, (True, None))
+		"""
+		classes = [list(c) for c in self.get_character_classes()]
+		classe_de = {}
+		for k in range(len(classes)):
+			classe_de[classes[k][0]] = k								# Seul le représentant de chaque classe est lu
+		automate_tmp = startautomaton(alphabet = self.get_alphabet(), epsilons = self.get_epsilons())
+
+		# Successeurs creux de chaque etat : couples (classe, destination)
+		successeurs = {}
+		for (e, l), fins in self._adjacence.items():
+			if l in classe_de:
+				for d in fins:
+					successeurs.setdefault(e, []).append((classe_de[l], d))
+
+		# On ne garde que les etats accessibles
+		etats = list(self._initial_states)
+		numero = {}
+		for e in etats:
+			numero[e] = len(numero)
+		i = 0
+		while i < len(etats):
+			for (k, dest) in successeurs.get(etats[i], ()):
+				if not dest in numero:
+					numero[dest] = len(numero)
+					etats.append(dest)
+			i += 1
+		if len(etats) == 0:
+			return automate_tmp
+
+		# Transitions inverses : pour chaque etat, ses predecesseurs par classe. L'etat puits,
+		# numerote n, n'a pas de predecesseurs enregistres.
+		puits = len(etats)
+		entrantes = [{} for e in range(puits)]
+		cibles = [[] for k in range(len(classes))]				# Les etats qui ont des predecesseurs par chaque classe
+		for e in etats:
+			for (k, dest) in successeurs.get(e, ()):
+				predecesseurs = entrantes[numero[dest]]
+				if not k in predecesseurs:
+					predecesseurs[k] = []
+					cibles[k].append(numero[dest])
+				predecesseurs[k].append(numero[e])
+
+		# Partition initiale : etats finaux / etats non finaux (dont le puits)
+		finaux = set(numero[e] for e in etats if e in self._final_states)
+		non_finaux = set(range(puits + 1)) - finaux
+		blocs = [non_finaux]
+		bloc_de = [0] * (puits + 1)
+		file_separateurs = []
+		en_file = [set()]
+
+		def enfiler(b):
+			# Enfile le bloc b pour chaque classe qui a une transition vers l'un de ses etats
+			for e in blocs[b]:
+				for c in entrantes[e]:
+					if not c in en_file[b]:
+						en_file[b].add(c)
+						file_separateurs.append((b, c))
+
+		if len(finaux) > 0:
+			blocs.append(finaux)
+			en_file.append(set())
+			for e in finaux:
+				bloc_de[e] = 1
+			enfiler(1)
+
+		# Raffinement
+		while len(file_separateurs) > 0:
+			b, a = file_separateurs.pop()
+			en_file[b].discard(a)
+			touches = {}
+			# On parcourt le plus petit ensemble : le bloc ou les etats atteints par la classe
+			if len(cibles[a]) < len(blocs[b]):
+				arrivees = [e for e in cibles[a] if bloc_de[e] == b]
+			else:
+				arrivees = blocs[b]
+			for e in arrivees:
+				for pred in entrantes[e].get(a, ()):
+					touches.setdefault(bloc_de[pred], []).append(pred)
+			for y, membres in touches.items():
+				if len(membres) == len(blocs[y]):
+					continue
+				nouveau = set(membres)								# Le puits n'a pas de transition vers b : il reste dans y
+				blocs[y] -= nouveau
+				z = len(blocs)
+				blocs.append(nouveau)
+				en_file.append(set())
+				for e in nouveau:
+					bloc_de[e] = z
+				for c in en_file[y]:									# y etait separateur : ses deux moities le sont
+					en_file[z].add(c)
+					file_separateurs.append((z, c))
+				if puits in blocs[y] or len(blocs[z]) <= len(blocs[y]):
+					enfiler(z)
+				else:
+					enfiler(y)
+
+		# Construction de l'automate quotient, sans la classe du puits, a partir d'un etat par bloc
+		bloc_puits = bloc_de[puits]
+		nouvel_id = {}
+		for e in range(puits):
+			if not bloc_de[e] in nouvel_id and bloc_de[e] != bloc_puits:
+				nouvel_id[bloc_de[e]] = len(nouvel_id) + 1
+		initial = bloc_de[0]
+		if initial == bloc_puits:
+			automate_tmp.add_initial_state(1)
+			return automate_tmp
+		traites = set()
+		for e in etats:
+			b = bloc_de[numero[e]]
+			if b == bloc_puits or b in traites:
+				continue
+			traites.add(b)
+			automate_tmp.add_state(nouvel_id[b])
+			if e in self._final_states:
+				automate_tmp.add_final_state(nouvel_id[b])
+			for (k, d) in successeurs.get(e, ()):
+				if bloc_de[numero[d]] != bloc_puits:
+					for l in classes[k]:
+						automate_tmp.add_transition((nouvel_id[b], l, nouvel_id[bloc_de[numero[d]]]))
+		automate_tmp.add_initial_state(nouvel_id[initial])
+		return automate_tmp
 
-	def determinisation(self, destructif=False):
+	def _determinisation_bitset(self):
+		"""
+		Construction des sous-ensembles où les états de l'automate sont numérotés de 0 à n-1 et
+		chaque sous-ensemble dense est codé par un entier (le bit i représente l'état i). Un
+		sous-ensemble creux (moins d'un état sur 64) est codé par l'ensemble figé de ses états :
+		un entier de n bits par sous-ensemble serait plus gros. Un dictionnaire associe à chaque
+		sous-ensemble déjà rencontré son numéro dans l'automate déterministe.
+		Renvoie un automate déterministe partiel dont les états sont les entiers de 1 à m : le
+		sous-ensemble vide n'est pas construit, les transitions qui y mèneraient sont absentes
+		(completer() ajoute l'état puits).
+
+		Les successeurs sont gardés état par état, pour les seules classes de lettres (voir
+		get_character_classes) qui ont une transition depuis cet état : depuis un sous-ensemble,
+		seules ces classes sont parcourues. Le coût ne dépend donc pas de la taille de l'alphabet
+		mais du nombre de transitions.
+
+		Exemple
+		>>> a = startautomaton(['a', 'b'], [], [], [0], [2],
+		...		[(0, 'a', 0), (0, 'b', 0), (0, 'a', 1), (1, 'b', 2)])
+		>>> d = a._determinisation_bitset()
+		>>> d.est_deterministe(), d.get_states() == set([1, 2, 3]), equivalent(a, d)
+		(True, True, (True, None))
+		>>> b = startautomaton(['a', 'b'], [], [], [0], [1], [(0, 'a', 1)])._determinisation_bitset()
+		>>> b.get_states() == set([1, 2]), b.est_complet()
+		(True, False)
+		"""
+		numero = {}
+		for e in self._states:
+			numero[e] = len(numero)
+		classes = [list(c) for c in self.get_character_classes()]
+		classe_de = {}
+		for k in range(len(classes)):
+			classe_de[classes[k][0]] = k								# Seul le représentant de chaque classe est lu
+
+		# Successeurs creux : pour chaque etat, les classes qui ont une transition depuis cet etat
+		successeurs = {}
+		for (e, l), fins in self._adjacence.items():
+			if len(fins) > 0 and l in classe_de:
+				successeurs.setdefault(e, []).append((classe_de[l], fins))
+		finaux = self._final_states
+		epsilons = len(self._epsilons) > 0
+
+		nb_etats = len(numero)
+		taille = (nb_etats + 7) // 8
+
+		def masque(etats):
+			if len(etats) * 64 < nb_etats:
+				return frozenset(etats)
+			octets = bytearray(taille)
+			for e in etats:
+				i = numero[e]
+				octets[i >> 3] |= 1 << (i & 7)
+			return int.from_bytes(octets, "little")
+
+		initial = set(self._initial_states)
+		if epsilons:
+			self._close_epsilons(initial)
+
+		# Parcours en largeur des sous-ensembles accessibles
+		ids = {masque(initial): 1}
+		file_etats = deque([(1, initial)])
+		stats = instrumentation.get_active()											# Compteurs de l'instrumentation (None si inactive)
+		if stats is not None:
+			stats.subsets += 1
+		transitions = []
+		etats_finaux = []
+		while len(file_etats) > 0:
+			id_courant, courant = file_etats.popleft()
+			if not finaux.isdisjoint(courant):
+				etats_finaux.append(id_courant)
+			cibles = {}
+			for e in courant:
+				for (k, fins) in successeurs.get(e, ()):
+					if k in cibles:
+						cibles[k].update(fins)
+					else:
+						cibles[k] = set(fins)
+			for k, nouveau in cibles.items():
+				if epsilons:
+					self._close_epsilons(nouveau)
+				cle = masque(nouveau)
+				if not cle in ids:
+					ids[cle] = len(ids) + 1
+					file_etats.append((ids[cle], nouveau))
+					if stats is not None:
+						stats.subsets += 1
+				for l in classes[k]:
+					transitions.append((id_courant, l, ids[cle]))
+
+		return startautomaton(
+			alphabet = self.get_alphabet(),
+			epsilons = self.get_epsilons(),
+			states = ids.values(),
+			initials = [1],
+			finals = etats_finaux,
+			transitions = transitions
+			)
+
+	@_mis_en_cache("determinisation")
+	def determinisation(self, destructif=False, methode="classique"):
 		"""
 		Renvoie l'automate déterministe. Le paramètre "destructif" rend destructive la méthode.
 		Par défaut, la méthode ne modifie pas l'automate
+
+		Le paramètre "methode" choisit la construction :
+		- "classique" (par défaut) : les états de l'automate déterministe sont les ensembles d'états
+		  de l'automate d'origine ;
+		- "bitset" : les sous-ensembles sont codés par des entiers et le résultat est un automate
+		  partiel (sans état puits) dont les états sont les entiers de 1 à m.
+
+		Exemple
+		>>> a = startautomaton(['a', 'b'], ['0'], [], [0], [3],
+		...		[(0, 'a', 0), (0, 'b', 0), (0, 'a', 1), (1, '0', 2), (2, 'b', 3)])
+		>>> equivalent(a.determinisation(), a.determinisation(False, "bitset"))
+		(True, None)
+		>>> a.determinisation(methode="bitmap")
+		Traceback (most recent call last):
+		...
+		Exception: Methode inconnue : bitmap
 		"""		
+		if not methode in ("classique", "bitset"):
+			raise Exception("Methode inconnue : " + str(methode))
+		if methode == "bitset":
+			automate_tmp = self._determinisation_bitset()
+			if destructif:
+				self.reconstruction(automate_tmp)
+			return automate_tmp
+
 		automate_tmp = startautomaton(
 		alphabet = self.get_alphabet(),
 		epsilons = self.get_epsilons())
@@ -282,11 +841,16 @@ class startautomaton(automaton):
 		else:
 			automate_clone = self.clone()
 
+		initiaux = automate_clone._expand_epsilons(automate_clone.get_initial_states())	# Les etats initiaux et leur epsilon-cloture
 		automate_clone.remove_epsilon_transitions()
-		finaux = automate_clone.get_final_states()											# On récupère les etats finaux
-		automate_tmp.add_initial_state(automate_clone.get_initial_states())		# On ajoute les etats initiaux de l'automate d'orgine
+		classes = automate_clone.get_character_classes()							# Une seule lettre par classe est lue
+		finaux = automate_clone.final_states_view()											# On récupère les etats finaux
+		automate_tmp.add_initial_state(initiaux)									# On ajoute les etats initiaux de l'automate d'orgine
 
 		file_etats = deque(automate_tmp.get_initial_states())						# On créé une file avec les etats initiaux
+		stats = instrumentation.get_active()												# Compteurs de l'instrumentation (None si inactive)
+		if stats is not None:
+			stats.subsets += 1
 
 		while len(file_etats) > 0:									# Tant qu'on a des etats rajoutés a l'automate deterministe
 			etat_courant = file_etats.popleft()							# On récupère l'etat a traiter
@@ -297,23 +861,23 @@ class startautomaton(automaton):
 			if not isinstance(etat_courant, pretty_set):				# On en fait un set, si s'en pas déjà un (juste pour simplifier l'implémentation)
 				etat_courant = set(etat_courant)
 			if not etat_courant == set():								# Si ce n'est pas un etat vide
-				for l in automate_clone.get_alphabet():								# Pour chaque lettre de l'alphabet
-					if not l in automate_clone.get_epsilons():						# On recupere l'etat accessible par cette lettre
-						nouveau = automate_clone._delta(l, etat_courant)
-						if not nouveau == set():
-							if not nouveau in automate_tmp.get_states():			# Si l'etat n'a pas encore ete rajoute a l'automate deterministe, on l'enfile
-								file_etats.append(nouveau)
-							for e in nouveau:								
-								if e in finaux:										# Si l'etat	est final dans l'automate original, alors je l'ajoute aux finaux de l'automate deterministe
-									automate_tmp.add_final_state(nouveau)
-									break
-
-							automate_tmp.add_transition((etat_courant, l, nouveau))	# On rajoute l'etat et la transition depuis l'etat traite
+				for classe in classes:												# Pour chaque classe de lettres
+					nouveau = automate_clone._delta(next(iter(classe)), etat_courant)	# On recupere l'etat accessible par les lettres de la classe
+					if not nouveau == set():
+						if not nouveau in automate_tmp.states_view():				# Si l'etat n'a pas encore ete rajoute a l'automate deterministe, on l'enfile
+							file_etats.append(nouveau)
+							if stats is not None:
+								stats.subsets += 1
+						for e in nouveau:								
+							if e in finaux:											# Si l'etat	est final dans l'automate original, alors je l'ajoute aux finaux de l'automate deterministe
+								automate_tmp.add_final_state(nouveau)
+								break
+
+						for l in classe:
+							automate_tmp.add_transition((etat_courant, l, nouveau))	# On rajoute l'etat et les transitions depuis l'etat traite
 
 		automate_tmp.completer(True)
 
-		automate_tmp._est_deterministe = True
-
 		if destructif:
 			automate_clone.reconstruction(automate_tmp)
 
@@ -333,95 +897,94 @@ class startautomaton(automaton):
 		)
 
 		# Inversion de toutes les transitions		
-		for trans in self.get_transitions():
+		for trans in self.transitions_view():
 			automate_tmp.add_transition(renverser_tuple(trans))
 
-		automate_tmp.est_deterministe()
-		automate_tmp.est_complet()
 
 		if destructif:
 			self.reconstruction(automate_tmp)
 			
 		return automate_tmp
 	
-	def union(self, aut2, destructif=False):
+	def _a_determiniser(self):
 		"""
-		Calcule l'union de deux automates. Le paramètre "destructif" rend destructive la méthode sur le premier automate.
-		Par défaut, la méthode ne modifie pas le premier automate
+		Renvoie Vrai si l'automate doit être déterminisé avant d'être parcouru comme un automate
+		déterministe
+		"""
+		return not self.est_deterministe()
+
+	def _produit(self, aut2, union):
+		"""
+		Construit l'automate produit de deux automates, en ne créant que les couples d'états
+		accessibles depuis le couple initial (parcours en largeur). Chaque couple reçoit un
+		numéro entier à partir de 1. Les automates n'ont pas besoin d'être complets : pour
+		l'union, un état absent est représenté par None dans le couple.
 		"""
-		
 		assert self.get_alphabet() == aut2.get_alphabet(), "Les deux automates n'ont pas le meme alphabet"
 		assert self.get_epsilons() == aut2.get_epsilons(), "Les epsilons ne sont pas encodees par les memes caracteres"
 
-		automate_clone = self.clone()
-
 		# On travaille sur des automates deterministes
-		if not aut2.est_deterministe():
+		automate_1 = self
+		if automate_1._a_determiniser():
+			automate_1 = automate_1.determinisation()
+		if aut2._a_determiniser():
 			aut2 = aut2.determinisation()
-			
-		if not self.est_deterministe():
-			automate_clone = self.determinisation(destructif)
-		
-		# On travaille sur des automates complet
-		if not aut2.est_complet():
-			aut2 = aut2.completer()
 
-		if not self.est_complet():
-			automate_clone = self.completer(destructif)		
+		lettres = [l for l in self.get_alphabet() if not l in self._epsilons]
+		automate_tmp = startautomaton(
+			alphabet = self.get_alphabet(),
+			epsilons = self.get_epsilons()
+			)
 
-		alphabet_courant = self.get_alphabet()
+		ini_1 = None
+		for e in automate_1._initial_states:
+			ini_1 = e
+		ini_2 = None
+		for e in aut2._initial_states:
+			ini_2 = e
+		if (ini_1 is None and ini_2 is None) or (not union and (ini_1 is None or ini_2 is None)):
+			return automate_tmp
+
+		numero = {}
+		file_etats = deque()
+
+		def ajouter(couple):
+			if not couple in numero:
+				numero[couple] = len(numero) + 1
+				file_etats.append(couple)
+				automate_tmp.add_state(numero[couple])
+				final_1 = couple[0] in automate_1._final_states
+				final_2 = couple[1] in aut2._final_states
+				if (union and (final_1 or final_2)) or (final_1 and final_2):
+					automate_tmp.add_final_state(numero[couple])
+			return numero[couple]
+
+		automate_tmp.add_initial_state(ajouter((ini_1, ini_2)))
+
+		while len(file_etats) > 0:
+			couple = file_etats.popleft()
+			etat_1, etat_2 = couple
+			for lettre in lettres:
+				dest_1 = None
+				for d in automate_1._adjacence.get((etat_1, lettre), ()):
+					dest_1 = d
+				dest_2 = None
+				for d in aut2._adjacence.get((etat_2, lettre), ()):
+					dest_2 = d
+				if dest_1 is None and dest_2 is None:
+					continue
+				if not union and (dest_1 is None or dest_2 is None):
+					continue
+				automate_tmp.add_transition((numero[couple], lettre, ajouter((dest_1, dest_2))))
 
-		automate_tmp = automaton(
-		alphabet= alphabet_courant,
-		epsilons= self.get_epsilons()
-			)
-		
-		finaux_1 = automate_clone.get_final_states()
-		finaux_2 = aut2.get_final_states()
-		
-		# Création états initiaux de l'automate de l'union
-
-
-		for ini_1 in automate_clone.get_initial_states():
-			for ini_2 in aut2.get_initial_states():
-				etat = (ini_1, ini_2)
-				automate_tmp.add_initial_state(etat)
-
-		# Création de l'automate des couples (automate de l'union)
-		for etat_1 in automate_clone.get_states():
-			for etat_2 in aut2.get_states():
-				automate_tmp.add_state((etat_1, etat_2))
-				for lettre in alphabet_courant:
-					for dest_1 in automate_clone.delta(lettre, [etat_1]):
-						for dest_2 in aut2.delta(lettre, [etat_2]):
-							automate_tmp.add_transition(((etat_1, etat_2), lettre, (dest_1, dest_2)))
-				if etat_1 in finaux_1 or etat_2 in finaux_2:
-					automate_tmp.add_final_state((etat_1, etat_2))
-
-
-		################## ANCIENNE IMPLÉMENTATION ##################################
-		# while len(pile_etats) > 0:
-		# 	etat_courant = pile_etats.pop()
-		# 	if not etat_courant == set():
-		# 		etat_1, etat_2 = etat_courant
-		# 		for l in self.get_alphabet():
-		# 			if not l in self.get_epsilons():
-		# 				delta_etat_1 = self._delta(l, [etat_1])
-		# 				delta_etat_2 =  aut2._delta(l, [etat_2])
-		# 				nouveau = set()
-		# 				for e1 in delta_etat_1:
-		# 					for e2 in delta_etat_2:
-		# 						nouveau = (e1,e2)
-						
-		# 				if not nouveau == set():
-		# 					if not nouveau in automate_tmp.get_states():
-		# 						pile_etats.append(nouveau)
-		# 					for e in nouveau:								
-		# 						if e in finaux:
-		# 							automate_tmp.add_final_state(nouveau)
-		# 							break
-
-		# 					automate_tmp.add_transition((etat_courant, l, nouveau))
+		return automate_tmp
+
+	def union(self, aut2, destructif=False):
+		"""
+		Calcule l'union de deux automates. Le paramètre "destructif" rend destructive la méthode sur le premier automate.
+		Par défaut, la méthode ne modifie pas le premier automate
+		"""
+		automate_tmp = self._produit(aut2, True)
 
 		if destructif:
 			self.reconstruction(automate_tmp)
@@ -432,86 +995,16 @@ class startautomaton(automaton):
 		"""
 		Calcule l'intersection de deux automates. Le paramètre "destructif" rend destructive la méthode sur le premier automate.
 		Par défaut, la méthode ne modifie pas le premier automate
+		Pour savoir seulement si l'intersection est vide, intersection_is_empty ne construit pas le produit.
 		"""
-		assert self.get_alphabet() == aut2.get_alphabet(), "Les deux automates n'ont pas le meme alphabet"
-		assert self.get_epsilons() == aut2.get_epsilons(), "Les epsilons ne sont pas encodees par les memes caracteres"
-
-		automate_clone = self.clone()
-
-		# On travaille sur des automates deterministes
-		if not aut2.est_deterministe():
-			aut2 = aut2.determinisation()
-			
-		if not self.est_deterministe():
-			automate_clone = self.determinisation(destructif)
-		
-		# On travaille sur des automates complet
-		if not aut2.est_complet():
-			aut2 = aut2.completer()
-
-		if not self.est_complet():
-			automate_clone = self.completer(destructif)		
-
-		alphabet_courant = self.get_alphabet()
-
-		automate_tmp = automaton(
-		alphabet= alphabet_courant,
-		epsilons= self.get_epsilons()
-			)
+		automate_tmp = self._produit(aut2, False)
 
-		finaux_1 = automate_clone.get_final_states()
-		finaux_2 = aut2.get_final_states()
-		
-		# Création états initiaux de l'automate de l'union
-
-
-		for ini_1 in automate_clone.get_initial_states():
-			for ini_2 in aut2.get_initial_states():
-				etat = (ini_1, ini_2)
-				automate_tmp.add_initial_state(etat)
-
-		# Création de l'automate des couples (automate de l'union)
-		for etat_1 in automate_clone.get_states():
-			for etat_2 in aut2.get_states():
-				automate_tmp.add_state((etat_1, etat_2))
-				for lettre in alphabet_courant:
-					for dest_1 in automate_clone.delta(lettre, [etat_1]):
-						for dest_2 in aut2.delta(lettre, [etat_2]):
-							automate_tmp.add_transition(((etat_1, etat_2), lettre, (dest_1, dest_2)))
-				if etat_1 in finaux_1 and etat_2 in finaux_2:
-					automate_tmp.add_final_state((etat_1, etat_2))
-
-
-		################## ANCIENNE IMPLÉMENTATION ##################################
-		# while len(pile_etats) > 0:
-		# 	etat_courant = pile_etats.pop()
-		# 	if not etat_courant == set():
-		# 		etat_1, etat_2 = etat_courant
-		# 		for l in self.get_alphabet():
-		# 			if not l in self.get_epsilons():
-		# 				delta_etat_1 = self._delta(l, [etat_1])
-		# 				delta_etat_2 =  aut2._delta(l, [etat_2])
-		# 				nouveau = set()
-		# 				for e1 in delta_etat_1:
-		# 					for e2 in delta_etat_2:
-		# 						nouveau = (e1,e2)
-						
-		# 				if not nouveau == set():
-		# 					if not nouveau in automate_tmp.get_states():
-		# 						pile_etats.append(nouveau)
-		# 					final = True
-		# 					for e in nouveau:								
-		# 						if not e in finaux:
-		# 							final = False
-		# 							break
-		# 					if final:
-		# 						automate_tmp.add_final_state(nouveau)
-		# 					automate_tmp.add_transition((etat_courant, l, nouveau))
 		if destructif:
 			self.reconstruction(automate_tmp)
 
 		return automate_tmp
 
+	@_mis_en_cache("complement")
 	def complement(self, destructif=False):
 		"""
 		Calcule le complement d'un automate. Le paramètre "destructif" rend destructive la méthode sur l'automate.
@@ -556,7 +1049,7 @@ class startautomaton(automaton):
 					if lettre in operateurs:															# Si c'est un +, * ou .
 						print("Erreur : expression mal formée au niveau d'un \"+\"")						#On renvoie un erreur
 						return []	
-					etat_max = self.get_maximal_id() + 1													# Sinon
+					etat_max = self.get_new_id()													# Sinon
 					self.add_transition((etat_ini, lettre, etat_max))											# On fait une transition depuis l'etat courant vers un nouvel etat par la lettre traitée
 					liste_etat_finaux_sous_automate += [etat_max] 												# Et on ajoute ce nouvel etat à la liste des etats finaux de ce sous-automate
 				else:																					# Sinon
@@ -629,7 +1122,7 @@ class startautomaton(automaton):
 		état, par l'élément lu
 		"""
 		liste_etat_finaux_sous_automate = []
-		etat_max = self.get_maximal_id() + 1
+		etat_max = self.get_new_id()
 		if not isinstance(expression, list):
 			self.add_transition((etat_ini, expression, etat_max))
 			liste_etat_finaux_sous_automate = [etat_max]
@@ -654,15 +1147,126 @@ class startautomaton(automaton):
 				else:
 					self.add_transition((etat_ini, e, etat_max))
 					liste_etat_finaux_sous_automate += [etat_max]
-					etat_max = self.get_maximal_id() + 1
+					etat_max = self.get_new_id()
 		return liste_etat_finaux_sous_automate
 	
 	@staticmethod
-	def express_to_auto(expression):
+	def _decomposer(expression):
+		"""
+		Renvoie l'opérateur d'une expression préfixée ("lettre", "concat", "ou" ou "etoile") et la
+		liste de ses paramètres. Une liste sans opérateur est l'union de ses éléments.
+		"""
+		operateurs = [".", "+", "*"]
+		if not isinstance(expression, list):
+			return "lettre", []
+		if len(expression) == 0:
+			return "concat", []
+		if expression[0] == ".":
+			return "concat", expression[1:]
+		if expression[0] in operateurs:
+			if len(expression) != 2:
+				raise Exception("Expression \"" + expression[0] + "\" mal formée")
+			parametre = expression[1]
+			if expression[0] == "*":
+				return "etoile", [parametre]
+			if isinstance(parametre, list) and (len(parametre) == 0 or not parametre[0] in operateurs):
+				return "ou", parametre
+			return "ou", [parametre]
+		return "ou", expression
+
+	def traitement_thompson(self, expression):
+		"""
+		Ajoute à l'automate l'automate de Thompson de l'expression préfixée, construit par un
+		parcours itératif (sans récursion) de l'expression. Chaque opérateur ajoute au plus deux
+		états, reliés par les epsilon transitions "concat", "plus" et "etoile".
+		Renvoie le couple (état initial, état final) de l'automate ajouté.
+
+		Exemple
+		>>> a = startautomaton(epsilons = ["concat", "plus", "etoile"])
+		>>> debut, fin = a.traitement_thompson([".", "a", ["*", "b"]])
+		>>> a.add_initial_state(debut)
+		>>> a.add_final_state(fin)
+		>>> a.word_is_recognized(["a", "b", "b"]), a.word_is_recognized(["a"]), a.word_is_recognized(["b"])
+		(True, True, False)
+		"""
+		pile = [(expression, False)]
+		fragments = []
+
+		def nouvel_etat():
+			etat = self.get_new_id()
+			self.add_state(etat)
+			return etat
+
+		while len(pile) > 0:
+			noeud, traite = pile.pop()
+			operateur, parametres = startautomaton._decomposer(noeud)
+			if operateur == "lettre":
+				debut = nouvel_etat()
+				fin = nouvel_etat()
+				self.add_transition((debut, noeud, fin))
+				fragments.append((debut, fin))
+			elif not traite:
+				pile.append((noeud, True))
+				for p in reversed(parametres):
+					pile.append((p, False))
+			else:
+				sous_fragments = fragments[len(fragments) - len(parametres):]
+				del fragments[len(fragments) - len(parametres):]
+				if operateur == "concat" and len(sous_fragments) > 0:
+					for i in range(len(sous_fragments) - 1):
+						self.add_transition((sous_fragments[i][1], "concat", sous_fragments[i + 1][0]))
+					fragments.append((sous_fragments[0][0], sous_fragments[-1][1]))
+					continue
+				debut = nouvel_etat()
+				fin = nouvel_etat()
+				if operateur == "concat":
+					self.add_transition((debut, "concat", fin))
+				elif operateur == "ou":
+					for (d, f) in sous_fragments:
+						self.add_transition((debut, "plus", d))
+						self.add_transition((f, "plus", fin))
+				else:
+					(d, f) = sous_fragments[0]
+					self.add_transition((debut, "etoile", d))
+					self.add_transition((f, "etoile", fin))
+					self.add_transition((f, "etoile", d))
+					self.add_transition((debut, "etoile", fin))
+				fragments.append((debut, fin))
+		return fragments[0]
+
+	@staticmethod
+	@_mis_en_cache("express_to_auto")
+	def express_to_auto(expression, methode="classique", minimal=True):
 		"""
 		Construit correspondant à l'expression préfixée passée en paramètre
+
+		Le paramètre "methode" choisit la construction :
+		- "classique" (par défaut) : construction récursive suivie de la minimisation de Brzozowski ;
+		- "thompson" : automate de Thompson, de taille linéaire, construit sans récursion. Si
+		  "minimal" est vrai, il est ensuite minimisé par l'algorithme de Hopcroft.
+
+		Exemple
+		>>> expression = [".", ["a"], ["*", ["+", [["a"], [".", ["a"], ["b"]]]]], ["b"]]
+		>>> equivalent(startautomaton.express_to_auto(expression),
+		...		startautomaton.express_to_auto(expression, "thompson"))
+		(True, None)
+		>>> startautomaton.express_to_auto(expression, "glushkov")
+		Traceback (most recent call last):
+		...
+		Exception: Methode inconnue : glushkov
 		"""
+		if not methode in ("classique", "thompson"):
+			raise Exception("Methode inconnue : " + str(methode))
 		transitions_operateurs = ["concat", "plus", "etoile"]
+		if methode == "thompson":
+			automate_tmp = startautomaton(epsilons = transitions_operateurs)
+			debut, fin = automate_tmp.traitement_thompson(expression)
+			automate_tmp.add_initial_state(debut)
+			automate_tmp.add_final_state(fin)
+			if minimal:
+				automate_tmp = automate_tmp.minimiser(False, "hopcroft")
+			return automate_tmp
+
 		automate_tmp = startautomaton(
 			initials =[0],
 			epsilons = transitions_operateurs
@@ -673,6 +1277,107 @@ class startautomaton(automaton):
 		return automate_tmp
 
 
+# Traitement par lots
+
+def _compacter(aut):
+	"""
+	Renvoie une représentation compacte (des listes de valeurs simples) d'un automate, pour
+	l'envoyer à un autre processus sans sérialiser tout le graphe d'objets.
+	"""
+	transitions = []
+	for (origine, lettre), fins in aut._adjacence.items():
+		if len(fins) > 0:
+			transitions.append((origine, lettre, list(fins)))
+	return (list(aut._alphabet), list(aut._epsilons), list(aut._states),
+		list(aut._initial_states), list(aut._final_states), transitions)
+
+def _decompacter(donnees):
+	"""
+	Reconstruit un startautomaton à partir de sa représentation compacte
+	"""
+	alphabet, epsilons, etats, initiaux, finaux, transitions = donnees
+	aut = startautomaton(alphabet, epsilons, etats, initiaux, finaux)
+	for (origine, lettre, fins) in transitions:
+		for fin in fins:
+			aut.add_transition((origine, lettre, fin))
+	return aut
+
+# Opérations de startautomaton qui renvoient un automate à partir d'un seul automate
+_OPERATIONS_PAR_LOTS = ("completer", "determinisation", "minimiser", "miroir", "complement")
+
+def _traiter_lot(operation, parametres, lot):
+	"""
+	Applique l'opération à chaque automate (compact) du lot, dans un processus de travail
+	"""
+	return [_compacter(getattr(_decompacter(d), operation)(**parametres)) for d in lot]
+
+def traitement_par_lots(automates, operation, parametres=None, processus=None, taille_lot=8, ordonne=True):
+	"""
+	Applique une opération ("completer", "determinisation", "minimiser", "miroir" ou
+	"complement") à chaque automate d'une liste ou d'un itérateur, en répartissant les automates
+	par lots de "taille_lot" entre "processus" processus (par défaut, autant que de coeurs). Les
+	automates voyagent entre les processus sous une forme compacte. "parametres" est un
+	dictionnaire d'arguments nommés passés à l'opération (par exemple {"methode": "hopcroft"}).
+
+	Renvoie un itérateur : si "ordonne" est vrai, il donne les automates résultats dans l'ordre
+	des automates d'entrée ; sinon, il donne les couples (position, résultat) dès qu'ils sont
+	prêts. Une opération inconnue lève une exception dès l'appel.
+
+	Exemple
+	>>> automates = [startautomaton(['a', 'b'], [], [], [0], [1], [(0, 'a', 1), (1, 'b', 1)]),
+	...		startautomaton(['a'], ['0'], [], [0], [2], [(0, '0', 1), (1, 'a', 2), (2, 'a', 1)]),
+	...		startautomaton(['a', 'b'], [], [], [0], [0], [(0, 'a', 1), (0, 'a', 0), (1, 'b', 0)])]
+	>>> list(traitement_par_lots(automates, "minimiser", processus=1, taille_lot=2)) == [a.minimiser() for a in automates]
+	True
+	>>> resultats = traitement_par_lots(automates, "determinisation", processus=1, taille_lot=1, ordonne=False)
+	>>> sorted(resultats, key=lambda r: r[0]) == list(enumerate(a.determinisation() for a in automates))
+	True
+	>>> traitement_par_lots(automates, "est_deterministe")
+	Traceback (most recent call last):
+	...
+	Exception: Operation inconnue : est_deterministe
+	"""
+	if not operation in _OPERATIONS_PAR_LOTS:
+		raise Exception("Operation inconnue : " + str(operation))
+	if parametres is None:
+		parametres = {}
+	if processus is None:
+		processus = os.cpu_count() or 1
+	return _traitement_par_lots(iter(automates), operation, parametres, processus, taille_lot, ordonne)
+
+def _traitement_par_lots(automates, operation, parametres, processus, taille_lot, ordonne):
+	"""
+	Générateur de traitement_par_lots, appelé une fois les paramètres vérifiés
+	"""
+	with ProcessPoolExecutor(max_workers = processus) as executeur:
+		en_cours = deque()
+		position = 0
+		fenetre = 2 * processus
+		termine = False
+		while not termine or len(en_cours) > 0:
+			# On garde au plus "fenetre" lots en cours, pour ne pas lire tout l'iterateur d'avance
+			while not termine and len(en_cours) < fenetre:
+				lot = [_compacter(a) for a in islice(automates, taille_lot)]
+				if len(lot) == 0:
+					termine = True
+					break
+				en_cours.append((position, executeur.submit(_traiter_lot, operation, parametres, lot)))
+				position += len(lot)
+			if len(en_cours) == 0:
+				break
+			if ordonne:
+				debut, futur = en_cours.popleft()
+				for donnees in futur.result():
+					yield _decompacter(donnees)
+			else:
+				wait([f for (d, f) in en_cours], return_when = FIRST_COMPLETED)
+				for (debut, futur) in list(en_cours):
+					if futur.done():
+						en_cours.remove((debut, futur))
+						for i, donnees in enumerate(futur.result()):
+							yield (debut + i, _decompacter(donnees))
+
+
 
 # Main pour tester
 
@@ -686,107 +1391,107 @@ if __name__ == "__main__":
 		transitions=[(0,'a',1), (0, 'a', 0), (1,'b',2), (2,'b',2), (2,'b',3), (3,'a',4), (4, 'a', 5), (4, 'a', 1), (5, '0', 0)]
 	)
 
-a.display("Voici l'automate A", False)
-a.print_alphabet()
-a.print_epsilons()
-a.print_etats()
-a.print_etats_initiaux()
-a.print_etats_finaux()
-a.print_transitions()
-
-print("L'automate a est-il deterministe ?\n", a.est_deterministe())
-
-print("L'automate A est-il complet ?\n", a.est_complet())
-
-tmp = a.clone()
-print("\nOn enlève les epsilons (remove_epsilons())")
-tmp.remove_epsilons()
-tmp.print_epsilons()
-tmp.display("L'automate A sans caracteres encodant epsilon")
-
-tmp = a.clone()
-print("\nOn enlève les etats intiaux")
-tmp.remove_initial_states()
-tmp.print_etats_initiaux()
-tmp.display("L'automate A sans etats initiaux")
-
-tmp = a.clone()
-print("\nOn enlève les etats finaux")
-tmp.remove_final_states()
-tmp.print_etats_finaux()
-tmp.display("L'automate A sans etats finaux")
-
-tmp = a.clone()
-print("\nOn enlève les transitions")
-tmp.remove_transitions()
-tmp.print_transitions()
-tmp.display("L'automate A sans transitions")
-
-tmp = a.clone()
-print("\nOn enlève les epsilon transitions")
-tmp.remove_epsilon_transitions()
-tmp.print_epsilons()
-tmp.display("L'automate A sans transitions epsilon")
-
-
-a.completer(False).display("L'automate A complet", False)
-a.determinisation(False).display("L'automate A determinise")
-a.miroir(False).display("Le miroir de l'automate A", False)
-a.minimiser(False).display("L'automate A minimise")
-a.complement(False).display("Complement de A")
-
-b = startautomaton(
-		alphabet= ['a','b','c'],
-		epsilons=[],
-		states = [], initials = [1], finals = [2],
-		transitions=[(1,'a',1), (1,'b',1), (1,'c',2), (2,'a',2), (2,'b',2), (2, 'c', 2)]
-	)
+	a.display("Voici l'automate A", False)
+	a.print_alphabet()
+	a.print_epsilons()
+	a.print_etats()
+	a.print_etats_initiaux()
+	a.print_etats_finaux()
+	a.print_transitions()
+
+	print("L'automate a est-il deterministe ?\n", a.est_deterministe())
+
+	print("L'automate A est-il complet ?\n", a.est_complet())
+
+	tmp = a.clone()
+	print("\nOn enlève les epsilons (remove_epsilons())")
+	tmp.remove_epsilons()
+	tmp.print_epsilons()
+	tmp.display("L'automate A sans caracteres encodant epsilon")
+
+	tmp = a.clone()
+	print("\nOn enlève les etats intiaux")
+	tmp.remove_initial_states()
+	tmp.print_etats_initiaux()
+	tmp.display("L'automate A sans etats initiaux")
+
+	tmp = a.clone()
+	print("\nOn enlève les etats finaux")
+	tmp.remove_final_states()
+	tmp.print_etats_finaux()
+	tmp.display("L'automate A sans etats finaux")
+
+	tmp = a.clone()
+	print("\nOn enlève les transitions")
+	tmp.remove_transitions()
+	tmp.print_transitions()
+	tmp.display("L'automate A sans transitions")
+
+	tmp = a.clone()
+	print("\nOn enlève les epsilon transitions")
+	tmp.remove_epsilon_transitions()
+	tmp.print_epsilons()
+	tmp.display("L'automate A sans transitions epsilon")
+
+
+	a.completer(False).display("L'automate A complet", False)
+	a.determinisation(False).display("L'automate A determinise")
+	a.miroir(False).display("Le miroir de l'automate A", False)
+	a.minimiser(False).display("L'automate A minimise")
+	a.complement(False).display("Complement de A")
+
+	b = startautomaton(
+			alphabet= ['a','b','c'],
+			epsilons=[],
+			states = [], initials = [1], finals = [2],
+			transitions=[(1,'a',1), (1,'b',1), (1,'c',2), (2,'a',2), (2,'b',2), (2, 'c', 2)]
+		)
 
-a = startautomaton(
-		alphabet= ['a','b','c'],
-		epsilons=[],
-		states = [], initials = [1], finals = [3],
-		transitions=[(1,'a',1), (1,'c',1), (1,'b',2), (2,'b',2), (2, 'c', 1), (2, 'a', 3), (3,'a',3), (3,'b',3), (3, 'c', 3)]
-	)
-a.display("Voici le nouvel automate A", False)
-b.display("Voici l'automate B", False)
-
-a.union(b, False).display("Voici l'union de A et B")
-a.intersection(b, False).display("Voici l'intersection de A et B")
-
-expression = "aa(a + ab)* b"
-expression_prefixee = 	[".", 
-							["a"], 
-							["a"], 
-							["*",  
-								["+", 
-									[ ["a"], 	[".", 
-												["a"], 
-												["b"] 
-											] 
+	a = startautomaton(
+			alphabet= ['a','b','c'],
+			epsilons=[],
+			states = [], initials = [1], finals = [3],
+			transitions=[(1,'a',1), (1,'c',1), (1,'b',2), (2,'b',2), (2, 'c', 1), (2, 'a', 3), (3,'a',3), (3,'b',3), (3, 'c', 3)]
+		)
+	a.display("Voici le nouvel automate A", False)
+	b.display("Voici l'automate B", False)
+
+	a.union(b, False).display("Voici l'union de A et B")
+	a.intersection(b, False).display("Voici l'intersection de A et B")
+
+	expression = "aa(a + ab)* b"
+	expression_prefixee = 	[".", 
+								["a"], 
+								["a"], 
+								["*",  
+									["+", 
+										[ ["a"], 	[".", 
+													["a"], 
+													["b"] 
+												] 
+										] 
 									] 
-								] 
-							], 
-							["b"] 
-						]
+								], 
+								["b"] 
+							]
 
-print("Et pour finir, l'automate minimal de l'expression : ", expression)
-startautomaton.express_to_auto(expression_prefixee).display("Automate minimal correspondant a une expression prefixee (cf code)")
+	print("Et pour finir, l'automate minimal de l'expression : ", expression)
+	startautomaton.express_to_auto(expression_prefixee).display("Automate minimal correspondant a une expression prefixee (cf code)")
 
 
-print("Importation de la liste d'automates à partir du fichier test.xml")
-liste_automates = xml_to_list_of_automata("test.xml")
+	print("Importation de la liste d'automates à partir du fichier test.xml")
+	liste_automates = xml_to_list_of_automata("test.xml")
 
-for auto in liste_automates:
-	auto.renumber_the_states()
+	for auto in liste_automates:
+		auto.renumber_the_states()
 
-liste_automates[0].display("Permier automate", False)
-liste_automates[1].display("Leur minimal", False)
+	liste_automates[0].display("Permier automate", False)
+	liste_automates[1].display("Leur minimal", False)
 
-a.auto_to_startauto(liste_automates[0])
-a.minimiser(True)
-a.renumber_the_states()
-a.display("Notre automate minimal", True)
+	a.auto_to_startauto(liste_automates[0])
+	a.minimiser(True)
+	a.renumber_the_states()
+	a.display("Notre automate minimal", True)
 
 
-print("FIN !")
\ No newline at end of file
+	print("FIN !")
\ No newline at end of file